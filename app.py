@@ -4,12 +4,19 @@ from tkinter import scrolledtext
 from tkinter import messagebox
 import os
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 from config import Config
-from utils import FileUtils, GUIUtils, ArchiveViewer
+from utils import FileUtils, topic_paths
+from gui import GUIUtils, ArchiveViewer, ArchiveSearchWindow
 from auto_responder import AutoResponder
 
 from auto_responder import AutoResponder
 from search import SafeWebSearcher
+from dispatcher import ResponseDispatcher
+from archive_writer import get_archive_writer
+from archive_index import get_archive_index
+import tracing
+import profiler
 
 # در app.py به این صورت استفاده کنید
 from search import search_and_save
@@ -65,8 +72,29 @@ class ChatApplication:
         self.root.title(Config.APP_NAME)
         self.root.geometry("850x700")
         
+        # پاسخ‌ها در پس‌زمینه تولید می‌شوند تا رابط کاربری قفل نشود
+        self.dispatcher = ResponseDispatcher(streaming=True)
+        self.pending_replies = {}
+        self.streamed_replies = set()
+        
+        self.topic_after_id = None
+        
+        # جستجوی بایگانی (نوشتن صف و به روز کردن نمایه) روی ترد جداگانه اجرا می‌شود
+        self.archive_search_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="archive-search")
+        self.archive_search = None
+        
+        # پیام‌هایی که در فریم بعدی در چت درج می‌شوند
+        self.display_queue = []
+        self.display_after_id = None
+        
         self.setup_ui()
         
+        # نمایه بایگانی‌ها در پس‌زمینه به روز می‌شود
+        get_archive_index()
+        
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after(Config.RESPONSE_POLL_MS, self.poll_responses)
+        
     def setup_ui(self):
         """تنظیم رابط کاربری"""
         self.create_session_frame()
@@ -74,6 +102,8 @@ class ChatApplication:
         self.create_input_frame()
         self.create_multi_line_input_button()
         self.create_control_buttons()
+        self.create_archive_search_frame()
+        self.create_trace_status_bar()
         
         # به روز رسانی نمایش نام فایل
         self.update_filename_display()
@@ -223,6 +253,120 @@ class ChatApplication:
             bd=2
         )
         self.open_folder_button.pack(side=tk.LEFT, padx=5)
+        
+        self.cancel_button = tk.Button(
+            button_frame,
+            text="لغو پاسخ‌ها",
+            command=self.cancel_pending_replies,
+            font=("Arial", 10),
+            bg="#795548",
+            fg="white",
+            width=12,
+            relief=tk.RAISED,
+            bd=2
+        )
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
+        
+        self.profile_button = tk.Button(
+            button_frame,
+            text="توقف پروفایل" if profiler.is_profiling() else "پروفایل",
+            command=self.toggle_profiler,
+            font=("Arial", 10),
+            bg="#3F51B5",
+            fg="white",
+            width=12,
+            relief=tk.RAISED,
+            bd=2
+        )
+        self.profile_button.pack(side=tk.LEFT, padx=5)
+    
+    def create_archive_search_frame(self):
+        """ایجاد جعبه جستجو در بایگانی‌ها"""
+        search_frame = tk.Frame(self.root)
+        search_frame.pack(padx=10, pady=5, fill=tk.X)
+        
+        tk.Label(search_frame, text="جستجو در بایگانی:", font=("Arial", 10)).pack(side=tk.LEFT, padx=5)
+        
+        self.archive_query = tk.Entry(
+            search_frame,
+            font=("Arial", 11),
+            width=40,
+            relief=tk.SUNKEN,
+            bd=2
+        )
+        self.archive_query.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+        self.archive_query.bind("<Return>", self.search_archives)
+        
+        self.archive_search_button = tk.Button(
+            search_frame,
+            text="جستجو",
+            command=self.search_archives,
+            font=("Arial", 10),
+            bg="#009688",
+            fg="white",
+            width=10,
+            relief=tk.RAISED,
+            bd=2
+        )
+        self.archive_search_button.pack(side=tk.RIGHT)
+    
+    def create_trace_status_bar(self):
+        """نوار وضعیت زمان مراحل آخرین پیام؛ فقط وقتی ردیابی فعال است"""
+        self.trace_status = None
+        if not tracing.is_enabled():
+            return
+        
+        self.trace_status = tk.Label(
+            self.root,
+            text="⏱ هنوز پیامی ردیابی نشده",
+            font=("Arial", 9),
+            anchor=tk.W,
+            relief=tk.SUNKEN,
+            bd=1,
+            fg="#555555"
+        )
+        self.trace_status.pack(side=tk.BOTTOM, fill=tk.X)
+    
+    def update_trace_status(self):
+        """نمایش زمان کل و زمان هر مرحله آخرین پیام ردیابی شده"""
+        last = tracing.last_trace()
+        if self.trace_status is None or last is None:
+            return
+        
+        stages = " · ".join(f"{name} {elapsed:.0f}ms" for name, elapsed in last.breakdown().items())
+        self.trace_status.config(text=f"⏱ {last.duration_ms:.0f}ms — {stages}")
+    
+    def search_archives(self, event=None):
+        """جستجوی کلیدواژه یا عبارت داخل گیومه در همه بایگانی‌ها"""
+        query = self.archive_query.get().strip()
+        if not query:
+            return
+        
+        # اگر جستجوی قبلی هنوز تمام نشده، فقط نتیجه جستجوی تازه نمایش داده می‌شود
+        polling = self.archive_search is not None
+        self.archive_search = (query, self.archive_search_executor.submit(get_archive_index().search, query))
+        if not polling:
+            self.root.after(Config.RESPONSE_POLL_MS, self.poll_archive_search)
+    
+    def poll_archive_search(self):
+        """نمایش نتیجه جستجوی بایگانی پس از آماده شدن در ترد پس‌زمینه"""
+        if self.archive_search is None:
+            return
+        query, future = self.archive_search
+        if not future.done():
+            self.root.after(Config.RESPONSE_POLL_MS, self.poll_archive_search)
+            return
+        
+        self.archive_search = None
+        try:
+            results = future.result()
+        except Exception as e:
+            self.show_error(f"خطا در جستجوی بایگانی: {e}")
+            return
+        if results:
+            ArchiveSearchWindow(self.root, query, results)
+        else:
+            messagebox.showinfo("اطلاعات", f"نتیجه‌ای برای '{query}' در بایگانی‌ها پیدا نشد.")
     
     def open_multi_line_input(self):
         """باز کردن پنجره ورودی چندخطی"""
@@ -235,33 +379,30 @@ class ChatApplication:
             self.display_message(f"شما: {message}", "user")
             
             # ذخیره پیام کاربر در فایل
+            topic = self.chat_topic.get().strip()
             user_filename, _ = self.get_current_filenames()
-            FileUtils.save_message_to_file(user_filename, f"کاربر: {message}")
+            FileUtils.save_message_to_file(user_filename, f"کاربر: {message}", topic, self.show_error)
             
-            # تولید و نمایش پاسخ خودکار
-            topic = self.chat_topic.get().strip()
-            bot_response = AutoResponder.process_message(message, topic)
-            self.display_message(f"ربات: {bot_response}", "bot")
+            # تولید و نمایش پاسخ خودکار در پس‌زمینه
+            self.request_reply(message, topic)
     
     def on_topic_change(self, event=None):
-        """هنگام تغییر موضوع"""
-        self.update_filename_display()
+        """هنگام تغییر موضوع؛ نمایش نام فایل پس از توقف تایپ به روز می‌شود"""
+        if self.topic_after_id is not None:
+            self.root.after_cancel(self.topic_after_id)
+        self.topic_after_id = self.root.after(Config.TOPIC_DEBOUNCE_MS, self.update_filename_display)
     
     def update_filename_display(self):
         """به روز رسانی نمایش نام فایل"""
-        topic = self.chat_topic.get().strip()
-        user_filename = FileUtils.generate_user_filename(topic)
-        response_filename = AutoResponder.generate_response_filename(topic)
+        self.topic_after_id = None
+        user_filename, response_filename = self.get_current_filenames()
         
         display_text = f"کاربر: {os.path.basename(user_filename)}\nپاسخ: {os.path.basename(response_filename)}"
         self.filename_label.config(text=display_text)
     
     def get_current_filenames(self):
         """دریافت نام فایل‌های جاری"""
-        topic = self.chat_topic.get().strip()
-        user_filename = FileUtils.generate_user_filename(topic)
-        response_filename = AutoResponder.generate_response_filename(topic)
-        return user_filename, response_filename
+        return topic_paths.resolve(self.chat_topic.get().strip())
     
     def send_message(self, event=None):
         """ارسال پیام"""
@@ -271,30 +412,170 @@ class ChatApplication:
             self.display_message(f"شما: {message}", "user")
             
             # ذخیره پیام کاربر در فایل
+            topic = self.chat_topic.get().strip()
             user_filename, _ = self.get_current_filenames()
-            FileUtils.save_message_to_file(user_filename, f"کاربر: {message}")
+            FileUtils.save_message_to_file(user_filename, f"کاربر: {message}", topic, self.show_error)
             
-            # تولید و نمایش پاسخ خودکار
-            topic = self.chat_topic.get().strip()
-            bot_response = AutoResponder.process_message(message, topic)
-            self.display_message(f"ربات: {bot_response}", "bot")
+            # تولید و نمایش پاسخ خودکار در پس‌زمینه
+            self.request_reply(message, topic)
             
             # پاک کردن فیلد ورودی
             self.user_input.delete(0, tk.END)
     
-    def display_message(self, message, sender_type):
-        """نمایش پیام در چت"""
-        self.chat_display.config(state=tk.NORMAL)
+    def request_reply(self, message, topic):
+        """ارسال پیام به پاسخ‌دهنده پس‌زمینه و نمایش پیام موقت"""
+        ticket = self.dispatcher.submit(message, topic)
+        if ticket is None:
+            self.display_message("ربات: صف پاسخ‌ها پر است، لطفاً کمی صبر کنید.", "bot")
+            return
+        
+        if AutoResponder.should_search(message):
+            placeholder = "ربات: 🔍 در حال جستجو…"
+        else:
+            placeholder = "ربات: …"
+        self.pending_replies[ticket] = f"reply_{ticket}"
+        self.display_message(placeholder, "bot", tag=self.pending_replies[ticket])
+    
+    def poll_responses(self):
+        """دریافت پاسخ‌های آماده از صف و جایگزینی پیام‌های موقت"""
+        events = self.dispatcher.poll()
+        if events:
+            # پیام‌های موقت در صف باید پیش از جایگزینی در جعبه متنی باشند
+            self.flush_display()
+            self.chat_display.config(state=tk.NORMAL)
+            for ticket, topic, kind, payload in events:
+                self.handle_reply_event(ticket, kind, payload)
+            self.trim_scrollback()
+            self.chat_display.config(state=tk.DISABLED)
+            self.chat_display.see(tk.END)
+            self.update_trace_status()
+        
+        self.root.after(Config.RESPONSE_POLL_MS, self.poll_responses)
+    
+    def handle_reply_event(self, ticket, kind, payload):
+        """اعمال یک رویداد پاسخ؛ جعبه متنی باید در حالت NORMAL باشد"""
+        if kind == "chunk":
+            self.append_to_reply(ticket, payload)
+            return
+        
+        # اگر بخشی از پاسخ قبلاً نمایش داده شده، فقط پایان آن ثبت می‌شود
+        if ticket in self.streamed_replies:
+            if kind == "error":
+                self.append_to_reply(ticket, f"\n(خطا در تولید پاسخ: {payload})")
+            elif kind == "cancelled":
+                self.append_to_reply(ticket, "\n(پاسخ لغو شد)")
+            self.finish_reply(ticket)
+            return
+        
+        if kind == "result":
+            text = f"ربات: {payload}"
+        elif kind == "error":
+            text = f"ربات: خطا در تولید پاسخ: {payload}"
+        else:
+            text = "ربات: (پاسخ لغو شد)"
+        self.replace_placeholder(ticket, text)
+    
+    def replace_placeholder(self, ticket, message):
+        """جایگزینی پیام موقت با پاسخ نهایی"""
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        tag = self.pending_replies.pop(ticket, None)
+        ranges = self.chat_display.tag_ranges(tag) if tag else ()
+        if not ranges:
+            # پیام موقت از ابتدای چت حذف شده؛ پاسخ در انتها نمایش داده می‌شود
+            self.chat_display.insert(tk.END, f"[{timestamp}] {message}\n")
+            return
+        
+        self.chat_display.delete(ranges[0], ranges[1])
+        self.chat_display.insert(ranges[0], f"[{timestamp}] {message}\n")
+        self.chat_display.tag_delete(tag)
+    
+    def append_to_reply(self, ticket, chunk):
+        """افزودن یک تکه از پاسخ تدریجی به جای پیام موقت"""
+        tag = self.pending_replies.get(ticket)
+        if tag is None:
+            return
+        
+        ranges = self.chat_display.tag_ranges(tag)
+        if ticket not in self.streamed_replies:
+            # تکه اول جایگزین متن «در حال جستجو» می‌شود
+            self.streamed_replies.add(ticket)
+            timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            index = ranges[0] if ranges else tk.END
+            if ranges:
+                self.chat_display.delete(ranges[0], ranges[1])
+            self.chat_display.insert(index, f"[{timestamp}] ربات: {chunk}\n", (tag,))
+        elif ranges:
+            self.chat_display.insert(f"{ranges[1]} - 1c", chunk, (tag,))
+        else:
+            self.chat_display.insert(tk.END, f"{chunk}\n", (tag,))
+    
+    def finish_reply(self, ticket):
+        """پایان پاسخ تدریجی"""
+        tag = self.pending_replies.pop(ticket, None)
+        self.streamed_replies.discard(ticket)
+        if tag:
+            self.chat_display.tag_delete(tag)
+    
+    def toggle_profiler(self):
+        """روشن و خاموش کردن پروفایلر نمونه‌بردار بدون راه‌اندازی دوباره برنامه"""
+        if profiler.is_profiling():
+            path = profiler.stop_profiler()
+            self.profile_button.config(text="پروفایل")
+            messagebox.showinfo("پروفایل", f"پروفایل در {os.path.abspath(path)} ذخیره شد.")
+        else:
+            profiler.start_profiler()
+            self.profile_button.config(text="توقف پروفایل")
+    
+    def cancel_pending_replies(self):
+        """لغو همه پاسخ‌های در حال انتظار"""
+        self.dispatcher.cancel_all()
+    
+    def on_close(self):
+        """بستن برنامه و توقف ترد‌های پس‌زمینه"""
+        self.dispatcher.shutdown()
+        self.archive_search_executor.shutdown(wait=False)
+        get_archive_writer().close()
+        get_archive_index().close()
+        self.root.destroy()
+    
+    def show_error(self, message):
+        """نمایش خطای ذخیره یا خواندن فایل"""
+        messagebox.showerror("خطا", message)
+
+    def display_message(self, message, sender_type, tag=None):
+        """نمایش پیام در چت؛ پیام‌های پشت سر هم در یک درج نوشته می‌شوند"""
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.display_queue.append(f"[{timestamp}] {message}\n")
+        self.display_queue.append((tag,) if tag else ())
         
-        formatted_message = f"[{timestamp}] {message}\n"
-        self.chat_display.insert(tk.END, formatted_message)
-        
+        if self.display_after_id is None:
+            self.display_after_id = self.root.after(Config.CHAT_FLUSH_MS, self.flush_display)
+    
+    def flush_display(self):
+        """درج همه پیام‌های در صف با یک فراخوانی insert"""
+        if self.display_after_id is not None:
+            self.root.after_cancel(self.display_after_id)
+            self.display_after_id = None
+        if not self.display_queue:
+            return
+        
+        # insert در Tk چند جفت متن و تگ را یک‌جا می‌پذیرد
+        pending, self.display_queue = self.display_queue, []
+        self.chat_display.config(state=tk.NORMAL)
+        self.chat_display.insert(tk.END, *pending)
+        self.trim_scrollback()
         self.chat_display.config(state=tk.DISABLED)
         self.chat_display.see(tk.END)
     
+    def trim_scrollback(self):
+        """حذف خط‌های قدیمی چت به صورت دسته‌ای؛ متن کامل در بایگانی می‌ماند"""
+        lines = int(self.chat_display.index("end - 1c").split(".")[0])
+        if lines > Config.CHAT_SCROLLBACK_LINES + Config.CHAT_EVICT_CHUNK:
+            self.chat_display.delete("1.0", f"{lines - Config.CHAT_SCROLLBACK_LINES + 1}.0")
+    
     def clear_chat(self):
         """پاک کردن محتوای چت"""
+        self.display_queue = []
         self.chat_display.config(state=tk.NORMAL)
         self.chat_display.delete(1.0, tk.END)
         self.chat_display.config(state=tk.DISABLED)
@@ -302,6 +583,7 @@ class ChatApplication:
     def view_user_archive(self):
         """نمایش بایگانی کاربر"""
         user_filename, _ = self.get_current_filenames()
+        get_archive_writer().flush(user_filename)
         if os.path.exists(user_filename):
             ArchiveViewer(self.root, user_filename, "بایگانی کاربر")
         else:
@@ -310,6 +592,7 @@ class ChatApplication:
     def view_response_archive(self):
         """نمایش بایگانی پاسخ‌ها"""
         _, response_filename = self.get_current_filenames()
+        get_archive_writer().flush(response_filename)
         if os.path.exists(response_filename):
             ArchiveViewer(self.root, response_filename, "بایگانی پاسخ‌ها")
         else:
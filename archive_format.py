@@ -0,0 +1,220 @@
+# archive_format.py
+# قالب رکوردی بایگانی‌ها: هر خط یک شیء JSON با ts، topic، role، text و hits اختیاری
+#
+#   python archive_format.py convert              # تبدیل بایگانی‌های .txt قدیمی به .jsonl
+#   python archive_format.py cat chat_archives/chat_2024-01-01_12-00-00_موضوع.jsonl
+import io
+import os
+import re
+import sys
+import glob
+import gzip
+import json
+import argparse
+import datetime
+from config import Config
+from segments import (COMPRESSED_EXTENSIONS, MANIFEST_NAME, ZSTD_AVAILABLE, compress_file,
+                      is_compressed)
+
+if ZSTD_AVAILABLE:
+    import zstandard
+
+# پیشوند نقش‌ها در خط‌های بایگانی متنی قدیمی و در نمایش رکوردها
+ROLE_PREFIXES = {"کاربر: ": "user", "ربات: ": "bot"}
+ROLE_LABELS = {role: prefix for prefix, role in ROLE_PREFIXES.items()}
+
+# [2024-01-01 12:00:00] کاربر: متن
+ARCHIVE_LINE = re.compile(r"^\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\] (.*)$")
+
+# chat_2024-01-01_12-00_موضوع.txt یا chat_2024-01-01_12-00-00-2_موضوع.jsonl
+ARCHIVE_NAME = re.compile(
+    r"^(?:chat|response)_\d{4}-\d{2}-\d{2}_\d{2}-\d{2}(?:-\d{2})?(?:-\d+)?_(.*?)\.(?:txt|jsonl)"
+)
+
+def split_role(message):
+    """(نقش، متن) از پیامی مثل «کاربر: سلام»؛ نقش پیام بدون پیشوند None است"""
+    for prefix, role in ROLE_PREFIXES.items():
+        if message.startswith(prefix):
+            return role, message[len(prefix):]
+    return None, message
+
+def make_record(topic, role, text, ts=None, hits=None):
+    record = {
+        'ts': ts or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'topic': topic,
+        'role': role,
+        'text': text,
+    }
+    if hits:
+        record['hits'] = hits
+    return record
+
+def encode_record(record):
+    """یک خط JSON؛ خط‌های داخل متن escape می‌شوند پس هر رکورد دقیقاً یک خط است"""
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+def decode_line(line):
+    """رکورد یک خط JSON، یا None برای خط خالی، ناقص یا متنی"""
+    if not line.startswith("{"):
+        return None
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    return record if isinstance(record, dict) else None
+
+def format_record(record):
+    """نمایش یک خطی رکورد به شکل بایگانی متنی قدیمی"""
+    label = ROLE_LABELS.get(record.get('role'), "")
+    text = str(record.get('text', "")).replace("\n", " ↵ ")
+    return f"[{record.get('ts', '')}] {label}{text}"
+
+def format_line(line):
+    """نمایش خط بایگانی؛ خط‌های غیر JSON (قالب قدیمی) بدون تغییر برمی‌گردند"""
+    record = decode_line(line)
+    return format_record(record) if record is not None else line
+
+def open_archive(path):
+    """باز کردن فایل بایگانی، ساده یا فشرده، به صورت جریان متنی"""
+    if path.endswith(COMPRESSED_EXTENSIONS['zstd']):
+        if not ZSTD_AVAILABLE:
+            raise OSError(f"برای خواندن {path} کتابخانه zstandard لازم است")
+        raw = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    elif path.endswith(COMPRESSED_EXTENSIONS['gzip']):
+        raw = gzip.open(path, "rb")
+    else:
+        raw = open(path, "rb")
+    return io.TextIOWrapper(raw, encoding="utf-8", errors="replace", newline="\n")
+
+def parse_text_lines(lines, topic=None):
+    """رکوردهای بایگانی متنی قدیمی؛ خط‌های بدون زمان ادامه پیام قبلی‌اند"""
+    current = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        match = ARCHIVE_LINE.match(line)
+        if match:
+            if current:
+                yield current
+            role, text = split_role(match.group(2))
+            current = make_record(topic, role, text, match.group(1))
+        elif line and set(line) == {"-"}:
+            # جداکننده رکوردهای بایگانی پاسخ‌ها
+            if current:
+                yield current
+            current = None
+        elif current:
+            current['text'] += "\n" + line
+    if current:
+        yield current
+
+def read_records(path, topic=None):
+    """خواندن جریانی رکوردهای یک فایل بایگانی با حافظه ثابت
+
+    فایل‌های .jsonl خط به خط خوانده می‌شوند و خط ناقص انتهای فایل (رکوردی که
+    هنوز کامل نوشته نشده) کنار گذاشته می‌شود. فایل‌های متنی قدیمی به همان
+    رکوردها تبدیل می‌شوند. topic برای فایل‌های قدیمی که موضوع ندارند به کار می‌رود.
+    """
+    with open_archive(path) as stream:
+        name = path[:path.rfind(".")] if is_compressed(path) else path
+        if name.endswith(".txt"):
+            yield from parse_text_lines(stream, topic)
+            return
+        for line in stream:
+            if not line.endswith("\n"):
+                break
+            record = decode_line(line)
+            if record is not None:
+                yield record
+
+def archive_topic(path):
+    """موضوع فایل بایگانی از manifest پوشه، یا از روی نام فایل"""
+    folder, name = os.path.split(path)
+    try:
+        with open(os.path.join(folder, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            for segment in json.load(f).get('segments', []):
+                if segment['file'] == name:
+                    return segment['topic']
+    except (OSError, ValueError):
+        pass
+    match = ARCHIVE_NAME.match(name)
+    return match.group(1) if match else name
+
+def convert_file(path, remove=True):
+    """تبدیل یک بایگانی متنی قدیمی به .jsonl؛ نسخه فشرده با همان روش فشرده می‌شود
+
+    مسیر فایل تازه را برمی‌گرداند. نام فایل در manifest پوشه هم به روز می‌شود.
+    """
+    method = None
+    for name, extension in COMPRESSED_EXTENSIONS.items():
+        if path.endswith(extension):
+            method = name
+    base = path[:-len(COMPRESSED_EXTENSIONS[method])] if method else path
+    target = base[:-len(".txt")] + ".jsonl"
+    temp_path = target + ".tmp"
+
+    topic = archive_topic(path)
+    with open(temp_path, "w", encoding="utf-8") as f:
+        for record in read_records(path, topic):
+            f.write(encode_record(record))
+    os.replace(temp_path, target)
+    if method:
+        compressed = compress_file(target, method)
+        os.remove(target)
+        target = compressed
+
+    _rename_in_manifest(path, target)
+    if remove:
+        os.remove(path)
+    return target
+
+def _rename_in_manifest(old_path, new_path):
+    folder = os.path.dirname(old_path)
+    manifest_path = os.path.join(folder, MANIFEST_NAME)
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return
+    old_name, new_name = os.path.basename(old_path), os.path.basename(new_path)
+    changed = False
+    for segment in manifest.get('segments', []):
+        if segment['file'] == old_name:
+            segment['file'] = new_name
+            changed = True
+    if changed:
+        temp_path = manifest_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+        os.replace(temp_path, manifest_path)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ابزار قالب رکوردی بایگانی‌ها")
+    commands = parser.add_subparsers(dest="command", required=True)
+    convert_parser = commands.add_parser("convert", help="تبدیل بایگانی‌های .txt به .jsonl")
+    convert_parser.add_argument("folders", nargs="*")
+    convert_parser.add_argument("--keep", action="store_true", help="فایل‌های .txt پس از تبدیل حذف نشوند")
+    cat_parser = commands.add_parser("cat", help="چاپ رکوردهای یک بایگانی به صورت JSON-Lines")
+    cat_parser.add_argument("paths", nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.command == "cat":
+        for path in args.paths:
+            for record in read_records(path, archive_topic(path)):
+                sys.stdout.write(encode_record(record))
+        return 0
+
+    # تا پایان تبدیل، اجرای دیگری از برنامه نباید در این پوشه‌ها بنویسد
+    converted = 0
+    for folder in args.folders or [Config.ARCHIVE_FOLDER, Config.RESPONSE_FOLDER]:
+        for pattern in ["*.txt"] + ["*.txt" + extension for extension in COMPRESSED_EXTENSIONS.values()]:
+            for path in sorted(glob.glob(os.path.join(folder, pattern))):
+                try:
+                    convert_file(path, not args.keep)
+                    converted += 1
+                except OSError as e:
+                    print(f"خطا در تبدیل {path}: {e}", file=sys.stderr)
+    print(f"✅ {converted} فایل به قالب JSON-Lines تبدیل شد", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
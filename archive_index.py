@@ -0,0 +1,258 @@
+# archive_index.py
+import os
+import re
+import glob
+import sqlite3
+import threading
+from config import Config
+from persian_text import normalize_text
+from archive_writer import get_archive_writer
+from segments import COMPRESSED_EXTENSIONS, add_compress_listener, archive_patterns, is_compressed, read_segment
+from archive_format import format_line
+
+class ArchiveIndex:
+    """نمایه متنی افزایشی روی فایل‌های بایگانی با SQLite FTS5
+
+    هر خط بایگانی یک سطر در جدول entries است و متن نرمال شده آن در جدول FTS
+    بدون محتوا نگه داشته می‌شود. برای هر فایل، آفست آخرین خط کامل نمایه شده
+    ذخیره می‌شود تا فقط خط‌های تازه خوانده شوند.
+
+    قطعه‌های فشرده تغییر نمی‌کنند؛ وقتی قطعه‌ای فشرده می‌شود سطرهای نسخه
+    متنی آن به مسیر تازه منتقل می‌شوند و فقط خط‌های نمایه نشده خوانده می‌شوند.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY,
+            offset INTEGER NOT NULL,
+            lines INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS entries (
+            id INTEGER PRIMARY KEY,
+            path TEXT NOT NULL,
+            line_no INTEGER NOT NULL,
+            text TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS entries_path ON entries(path);
+        CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+            text, content='', tokenize='unicode61 remove_diacritics 0'
+        );
+    """
+
+    def __init__(self, db_path=None, folders=None):
+        self.db_path = db_path or Config.ARCHIVE_INDEX_PATH
+        self.folders = folders or [Config.ARCHIVE_FOLDER, Config.RESPONSE_FOLDER]
+
+        # یک اتصال مشترک؛ دسترسی از تردهای مختلف با قفل مرتب می‌شود
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(self.SCHEMA)
+
+        self._dirty = set()
+        self._dirty_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._worker = None
+
+    def start(self):
+        """نمایه کردن فایل‌های موجود و پیگیری نوشته‌های تازه در پس‌زمینه"""
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="archive-index", daemon=True)
+            self._worker.start()
+        for path in self.archive_files():
+            self.notify(path)
+
+    def archive_files(self):
+        files = []
+        for folder in self.folders:
+            for pattern in archive_patterns():
+                files.extend(glob.glob(os.path.join(folder, pattern)))
+        return files
+
+    def notify(self, path, nbytes=None):
+        """علامت زدن فایل برای نمایه کردن خط‌های تازه"""
+        with self._dirty_lock:
+            self._dirty.add(path)
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            if self._closed:
+                return
+            self.catch_up()
+
+    def catch_up(self):
+        """نمایه کردن همه فایل‌هایی که از آخرین بار تغییر کرده‌اند"""
+        with self._dirty_lock:
+            paths, self._dirty = self._dirty, set()
+        for path in paths:
+            try:
+                self.index_file(path)
+            except (OSError, sqlite3.Error) as e:
+                print(f"خطا در نمایه کردن {path}: {e}")
+
+    def index_file(self, path):
+        """افزودن خط‌های کامل تازه یک فایل؛ تعداد خط‌های افزوده را برمی‌گرداند"""
+        with self._lock:
+            if self._closed:
+                return 0
+            row = self.connection.execute(
+                "SELECT offset, lines FROM files WHERE path = ?", (path,)
+            ).fetchone()
+            offset, line_no = row if row else (0, 0)
+
+            if is_compressed(path):
+                return 0 if row else self._index_segment(path)
+
+            if not os.path.exists(path):
+                # قطعه‌ای که در این فاصله فشرده شده از نسخه فشرده ادامه می‌یابد
+                for extension in COMPRESSED_EXTENSIONS.values():
+                    if os.path.exists(path + extension):
+                        return self._index_segment(path + extension)
+                self._remove_file(path)
+                return 0
+
+            size = os.path.getsize(path)
+            if size < offset:
+                # فایل کوتاه یا جایگزین شده؛ از ابتدا نمایه می‌شود
+                self._remove_file(path)
+                offset, line_no = 0, 0
+            if size == offset:
+                return 0
+
+            with open(path, "rb") as f:
+                f.seek(offset)
+                data = f.read(size - offset)
+
+            return self._insert_lines(path, data, offset, line_no)
+
+    def _index_segment(self, path):
+        """نمایه قطعه فشرده؛ سطرهای نسخه متنی پیشین آن دوباره ساخته نمی‌شوند"""
+        source = path[:path.rfind(".")]
+        row = self.connection.execute(
+            "SELECT offset, lines FROM files WHERE path = ?", (source,)
+        ).fetchone()
+        offset, line_no = row if row else (0, 0)
+        if row:
+            with self.connection:
+                self.connection.execute("UPDATE entries SET path = ? WHERE path = ?", (path, source))
+                self.connection.execute("UPDATE files SET path = ? WHERE path = ?", (path, source))
+
+        data = read_segment(path)[offset:]
+        added = self._insert_lines(path, data, offset, line_no)
+        if not row and not added:
+            # قطعه بدون خط کامل هم ثبت می‌شود تا هر بار از حالت فشرده باز نشود
+            with self.connection:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO files (path, offset, lines) VALUES (?, ?, ?)", (path, offset, line_no)
+                )
+        return added
+
+    def _insert_lines(self, path, data, offset, line_no):
+        # خط ناقص آخر برای دفعه بعد می‌ماند
+        end = data.rfind(b"\n") + 1
+        if not end:
+            return 0
+
+        added = 0
+        with self.connection:
+            for raw in data[:end].split(b"\n")[:-1]:
+                line_no += 1
+                # رکوردهای JSON به همان شکلی نمایه می‌شوند که در نمایشگر دیده می‌شوند
+                text = format_line(raw.decode("utf-8", errors="replace").rstrip("\r"))
+                if not text.strip():
+                    continue
+                cursor = self.connection.execute(
+                    "INSERT INTO entries (path, line_no, text) VALUES (?, ?, ?)",
+                    (path, line_no, text)
+                )
+                self.connection.execute(
+                    "INSERT INTO entries_fts (rowid, text) VALUES (?, ?)",
+                    (cursor.lastrowid, normalize_text(text))
+                )
+                added += 1
+            self.connection.execute(
+                "INSERT OR REPLACE INTO files (path, offset, lines) VALUES (?, ?, ?)",
+                (path, offset + end, line_no)
+            )
+        return added
+
+    def _remove_file(self, path):
+        with self.connection:
+            rows = self.connection.execute(
+                "SELECT id, text FROM entries WHERE path = ?", (path,)
+            ).fetchall()
+            # جدول FTS بدون محتوا فقط با دستور delete و متن اصلی پاک می‌شود
+            self.connection.executemany(
+                "INSERT INTO entries_fts (entries_fts, rowid, text) VALUES ('delete', ?, ?)",
+                [(entry_id, normalize_text(text)) for entry_id, text in rows]
+            )
+            self.connection.execute("DELETE FROM entries WHERE path = ?", (path,))
+            self.connection.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    @staticmethod
+    def build_match(query):
+        """تبدیل جستجوی کاربر به عبارت MATCH؛ متن داخل گیومه عبارت دقیق است"""
+        terms = []
+        for phrase, word in re.findall(r'"([^"]*)"|(\S+)', query):
+            text = normalize_text(phrase or word)
+            prefix = bool(word) and text.endswith("*")
+            tokens = re.findall(r"\w+", text)
+            if not tokens:
+                continue
+            # هر توکن داخل گیومه قرار می‌گیرد تا نحو FTS5 در متن کاربر اثر نکند
+            term = '"' + " ".join(tokens) + '"'
+            terms.append(term + "*" if prefix else term)
+        return " ".join(terms)
+
+    def search(self, query, limit=None):
+        """جستجوی کلیدواژه و عبارت در همه بایگانی‌ها، مرتب شده با bm25"""
+        limit = limit or Config.ARCHIVE_SEARCH_LIMIT
+        match = self.build_match(query)
+        if not match:
+            return []
+
+        # نوشته‌های در صف پیش از جستجو روی دیسک و در نمایه می‌آیند
+        get_archive_writer().flush()
+        self.catch_up()
+
+        with self._lock:
+            rows = self.connection.execute(
+                """
+                SELECT entries.path, entries.line_no, entries.text, bm25(entries_fts) AS score
+                FROM entries_fts JOIN entries ON entries.id = entries_fts.rowid
+                WHERE entries_fts MATCH ?
+                ORDER BY score
+                LIMIT ?
+                """,
+                (match, limit)
+            ).fetchall()
+
+        return [
+            {'path': path, 'line_no': line_no, 'text': text, 'score': score}
+            for path, line_no, text, score in rows
+        ]
+
+    def close(self):
+        self._closed = True
+        self._wakeup.set()
+        with self._lock:
+            self.connection.close()
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_archive_index():
+    """نمایه مشترک که نوشته‌های ArchiveWriter را دنبال می‌کند"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ArchiveIndex()
+            get_archive_writer().add_listener(_index.notify)
+            add_compress_listener(_index.notify)
+            _index.start()
+        return _index
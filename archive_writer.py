@@ -0,0 +1,200 @@
+# archive_writer.py
+import os
+import time
+import atexit
+import threading
+from collections import OrderedDict
+from config import Config
+import tracing
+
+class ArchiveWriter:
+    """سرویس نوشتن بایگانی با فایل‌های باز نگه داشته شده و نوشتن دسته‌ای
+
+    خط‌ها در حافظه جمع می‌شوند و وقتی حجمشان از ARCHIVE_FLUSH_BYTES بیشتر شود
+    یا ARCHIVE_FLUSH_INTERVAL ثانیه از اولین خط نوشته نشده بگذرد، با یک write
+    برای هر فایل نوشته می‌شوند.
+
+    سیاست fsync:
+        never    -- تصمیم با سیستم‌عامل
+        batch    -- پس از هر نوشتن دسته‌ای
+        interval -- حداکثر یک بار در هر ARCHIVE_FSYNC_INTERVAL ثانیه
+    """
+
+    FSYNC_POLICIES = ("never", "batch", "interval")
+
+    def __init__(self, flush_bytes=None, flush_interval=None, fsync_policy=None, max_open_files=None):
+        self.flush_bytes = flush_bytes or Config.ARCHIVE_FLUSH_BYTES
+        self.flush_interval = flush_interval or Config.ARCHIVE_FLUSH_INTERVAL
+        self.fsync_policy = fsync_policy or Config.ARCHIVE_FSYNC_POLICY
+        self.max_open_files = max_open_files or Config.ARCHIVE_MAX_OPEN_FILES
+        if self.fsync_policy not in self.FSYNC_POLICIES:
+            raise ValueError(f"سیاست fsync نامعتبر: {self.fsync_policy}")
+
+        self._lock = threading.RLock()
+        self._buffers = {}
+        self._pending_bytes = 0
+        self._oldest_pending = None
+        self._handles = OrderedDict()
+        self._last_fsync = time.monotonic()
+        self._listeners = []
+        # فایل‌های مهر شده تا پایان فشرده‌سازی: {مسیر: تابعی که مسیر جایگزین را برمی‌گرداند}
+        self._sealed = {}
+
+        self._closed = False
+        self._wakeup = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="archive-writer", daemon=True)
+        self._flusher.start()
+
+    def write(self, path, text):
+        """افزودن متن به صف نوشتن فایل"""
+        with self._lock:
+            if self._closed:
+                raise ValueError("ArchiveWriter بسته شده است")
+
+            path = self._resolve(path)
+            self._buffers.setdefault(path, []).append(text)
+            self._pending_bytes += len(text)
+            if self._oldest_pending is None:
+                self._oldest_pending = time.monotonic()
+
+            if self._pending_bytes >= self.flush_bytes:
+                self._flush_locked()
+
+    def add_listener(self, callback):
+        """ثبت تابعی که پس از هر نوشتن روی دیسک با مسیر فایل و تعداد بایت‌ها صدا زده می‌شود"""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def flush(self, path=None):
+        """نوشتن فوری خط‌های در صف؛ همه فایل‌ها یا فقط یک فایل"""
+        with self._lock:
+            if path is None:
+                self._flush_locked()
+            elif path in self._buffers:
+                parts = self._buffers.pop(path)
+                self._pending_bytes -= sum(len(part) for part in parts)
+                self._write_file(path, parts)
+                if not self._buffers:
+                    self._pending_bytes = 0
+                    self._oldest_pending = None
+
+    def _flush_locked(self):
+        if not self._buffers:
+            return
+
+        buffers, self._buffers = self._buffers, {}
+        self._pending_bytes = 0
+        self._oldest_pending = None
+
+        with tracing.span("archive_flush"):
+            for path, parts in buffers.items():
+                try:
+                    self._write_file(path, parts)
+                except OSError as e:
+                    print(f"خطا در ذخیره بایگانی {path}: {e}")
+
+            if self.fsync_policy == "interval" and time.monotonic() - self._last_fsync >= Config.ARCHIVE_FSYNC_INTERVAL:
+                self._fsync_all()
+
+    def _write_file(self, path, parts):
+        handle = self._get_handle(path)
+        data = "".join(parts).encode("utf-8")
+        handle.write(data)
+        handle.flush()
+        if self.fsync_policy == "batch":
+            os.fsync(handle.fileno())
+        for listener in self._listeners:
+            listener(path, len(data))
+
+    def _get_handle(self, path):
+        handle = self._handles.get(path)
+        if handle is not None:
+            self._handles.move_to_end(path)
+            return handle
+        if path in self._sealed:
+            raise OSError(f"فایل {path} مهر شده است و دوباره باز نمی‌شود")
+
+        while len(self._handles) >= self.max_open_files:
+            _, oldest = self._handles.popitem(last=False)
+            oldest.close()
+
+        handle = self._handles[path] = open(path, "ab")
+        return handle
+
+    def release(self, path):
+        """نوشتن خط‌های در صف یک فایل و بستن فایل باز آن، مثلاً پیش از فشرده‌سازی"""
+        with self._lock:
+            self.flush(path)
+            handle = self._handles.pop(path, None)
+            if handle is not None:
+                if self.fsync_policy != "never":
+                    os.fsync(handle.fileno())
+                handle.close()
+
+    def seal(self, path, redirect=None):
+        """بستن همیشگی یک فایل، مثلاً پیش از فشرده‌سازی و حذف آن
+
+        خط‌های در صف فایل نوشته می‌شوند و فایل دیگر باز نمی‌شود. نوشتن‌های
+        بعدی به مسیری که redirect برمی‌گرداند می‌روند، پس نوشتنی که مسیر را
+        پیش از بسته شدن قطعه گرفته بود گم نمی‌شود و فایل حذف شده را دوباره
+        نمی‌سازد.
+        """
+        with self._lock:
+            self.release(path)
+            self._sealed[path] = redirect
+
+    def unseal(self, path):
+        """فراموش کردن فایل مهر شده پس از فشرده شدن و حذف آن"""
+        with self._lock:
+            self._sealed.pop(path, None)
+
+    def _resolve(self, path):
+        redirect = self._sealed.get(path)
+        if redirect is None:
+            if path in self._sealed:
+                raise ValueError(f"فایل {path} مهر شده است")
+            return path
+        # redirect مسیر نهایی (قطعه فعال) را می‌دهد، پس زنجیره‌ای دنبال نمی‌شود
+        target = redirect()
+        if target in self._sealed:
+            raise ValueError(f"مسیر جایگزین {target} هم مهر شده است")
+        return target
+
+    def _fsync_all(self):
+        for handle in self._handles.values():
+            os.fsync(handle.fileno())
+        self._last_fsync = time.monotonic()
+
+    def _flush_loop(self):
+        """ترد پس‌زمینه برای نوشتن خط‌هایی که مدتی در صف مانده‌اند"""
+        while not self._wakeup.wait(self.flush_interval / 2):
+            with self._lock:
+                oldest = self._oldest_pending
+                if oldest is not None and time.monotonic() - oldest >= self.flush_interval:
+                    self._flush_locked()
+
+    def close(self):
+        """نوشتن همه خط‌های باقی‌مانده و بستن فایل‌ها"""
+        with self._lock:
+            if self._closed:
+                return
+            self._flush_locked()
+            if self.fsync_policy != "never":
+                self._fsync_all()
+            for handle in self._handles.values():
+                handle.close()
+            self._handles.clear()
+            self._closed = True
+        self._wakeup.set()
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_archive_writer():
+    """سرویس مشترک نوشتن بایگانی که در پایان برنامه بسته می‌شود"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = ArchiveWriter()
+            atexit.register(_writer.close)
+        return _writer
@@ -0,0 +1,353 @@
+# async_search.py
+import asyncio
+import gzip
+import ssl
+import threading
+import time
+import weakref
+import zlib
+from urllib.parse import quote_plus, urlsplit, urljoin
+from config import Config
+from rate_limiter import HostRateLimiter
+from search import (
+    SafeWebSearcher, get_query_cache, merge_results,
+    parse_bing_results, parse_duckduckgo_results, parse_generic_links,
+    BING_SEARCH_URL, DUCKDUCKGO_SEARCH_URL
+)
+
+class AsyncHTTPClient:
+    """کلاینت ساده HTTP/1.1 روی asyncio streams با نگهداری اتصال‌های keep-alive"""
+
+    REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+    def __init__(self, max_idle_per_host=None, verify_ssl=False):
+        self.max_idle_per_host = max_idle_per_host or Config.HTTP_POOL_MAXSIZE
+        self._idle = {}
+        self.stats = {'new': 0, 'reused': 0}
+
+        self.ssl_context = ssl.create_default_context()
+        if not verify_ssl:
+            self.ssl_context.check_hostname = False
+            self.ssl_context.verify_mode = ssl.CERT_NONE
+
+    async def get(self, url, headers=None, timeout=10, max_redirects=5):
+        """ارسال درخواست GET؛ (وضعیت، هدرها، متن) را برمی‌گرداند"""
+        for _ in range(max_redirects + 1):
+            status, response_headers, body = await asyncio.wait_for(
+                self._request(url, headers or {}), timeout
+            )
+            if status in self.REDIRECT_STATUSES and 'location' in response_headers:
+                url = urljoin(url, response_headers['location'])
+                continue
+            break
+
+        return status, response_headers, self._decode_body(response_headers, body)
+
+    async def _request(self, url, headers):
+        parts = urlsplit(url)
+        https = parts.scheme == 'https'
+        port = parts.port or (443 if https else 80)
+        key = (parts.scheme, parts.hostname, port)
+
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+
+        lines = [
+            f"GET {path} HTTP/1.1",
+            f"Host: {parts.netloc}",
+            "Accept-Encoding: gzip, deflate",
+            "Connection: keep-alive",
+        ]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        request = ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1')
+
+        connection = self._checkout(key)
+        if connection is not None:
+            try:
+                return await self._send(key, connection, request)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # اتصال بیکار از طرف سرور بسته شده بود؛ یک بار با اتصال تازه تلاش می‌کنیم
+                pass
+
+        reader, writer = await asyncio.open_connection(
+            parts.hostname, port,
+            ssl=self.ssl_context if https else None,
+            server_hostname=parts.hostname if https else None
+        )
+        self.stats['new'] += 1
+        return await self._send(key, (reader, writer), request)
+
+    async def _send(self, key, connection, request):
+        reader, writer = connection
+        try:
+            writer.write(request)
+            await writer.drain()
+            status, headers, body, keep_alive = await self._read_response(reader)
+        except BaseException:
+            # اتصال نیمه‌کاره (از جمله پس از لغو) قابل استفاده مجدد نیست
+            writer.close()
+            raise
+
+        if keep_alive:
+            self._checkin(key, connection)
+        else:
+            writer.close()
+        return status, headers, body
+
+    def _checkout(self, key):
+        idle = self._idle.get(key)
+        while idle:
+            reader, writer = idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                self.stats['reused'] += 1
+                return reader, writer
+            writer.close()
+        return None
+
+    def _checkin(self, key, connection):
+        idle = self._idle.setdefault(key, [])
+        if len(idle) < self.max_idle_per_host:
+            idle.append(connection)
+        else:
+            connection[1].close()
+
+    @staticmethod
+    async def _read_response(reader):
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed before response")
+
+        version, status = status_line.decode('latin-1').split(None, 2)[:2]
+        status = int(status)
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            name = name.strip().lower()
+            value = value.strip()
+            headers[name] = f"{headers[name]}, {value}" if name in headers else value
+
+        keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0].strip(), 16)
+                if size == 0:
+                    # خواندن trailer ها تا خط خالی
+                    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            body = b''.join(chunks)
+        elif 'content-length' in headers:
+            body = await reader.readexactly(int(headers['content-length']))
+        elif status in (204, 304) or 100 <= status < 200:
+            body = b''
+        else:
+            body = await reader.read()
+            keep_alive = False
+
+        return status, headers, body, keep_alive
+
+    @staticmethod
+    def _decode_body(headers, body):
+        encoding = headers.get('content-encoding', '').lower()
+        if encoding == 'gzip':
+            body = gzip.decompress(body)
+        elif encoding == 'deflate':
+            try:
+                body = zlib.decompress(body)
+            except zlib.error:
+                body = zlib.decompress(body, -zlib.MAX_WBITS)
+
+        charset = 'utf-8'
+        for part in headers.get('content-type', '').split(';'):
+            name, _, value = part.strip().partition('=')
+            if name.lower() == 'charset' and value:
+                charset = value.strip('"\'')
+        try:
+            return body.decode(charset, errors='replace')
+        except LookupError:
+            return body.decode('utf-8', errors='replace')
+
+    async def close(self):
+        """بستن همه اتصال‌های بیکار"""
+        for idle in self._idle.values():
+            for _, writer in idle:
+                writer.close()
+        self._idle.clear()
+
+class AsyncSafeWebSearcher:
+    """نسخه asyncio از SafeWebSearcher برای اجرای هم‌زمان تعداد زیادی جستجو"""
+
+    # متدهای بدون وابستگی به شبکه از SafeWebSearcher گرفته می‌شوند
+    get_random_user_agent = SafeWebSearcher.get_random_user_agent
+    get_mock_results = SafeWebSearcher.get_mock_results
+    save_to_dictionary = SafeWebSearcher.save_to_dictionary
+    append_to_file = SafeWebSearcher.append_to_file
+    get_parallel_engines = SafeWebSearcher.get_parallel_engines
+
+    def __init__(self, concurrency=None, client=None):
+        self.search_results = {}
+        self.user_agents = list(SafeWebSearcher.USER_AGENTS)
+        self.search_engines = list(SafeWebSearcher.SEARCH_ENGINES)
+        self.bing_search_url = BING_SEARCH_URL
+        self.duckduckgo_search_url = DUCKDUCKGO_SEARCH_URL
+        self._results_lock = threading.Lock()
+
+        self.client = client or AsyncHTTPClient()
+        self.rate_limiter = HostRateLimiter()
+        self.concurrency = concurrency or Config.ASYNC_SEARCH_CONCURRENCY
+        self._semaphore = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def connection_stats(self):
+        return dict(self.client.stats)
+
+    async def safe_request(self, url, timeout=10):
+        """درخواست ایمن با رعایت محدودیت نرخ هر میزبان"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        host = urlsplit(url).netloc
+        delay = self.rate_limiter.reserve(host)
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self.rate_limiter.refund(host)
+                raise
+
+        headers = {
+            'User-Agent': self.get_random_user_agent(),
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.5',
+        }
+        async with self._semaphore:
+            try:
+                status, response_headers, text = await self.client.get(url, headers, timeout)
+            except (OSError, ValueError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                print(f"خطا در درخواست: {e}")
+                return None
+
+        self.rate_limiter.on_response(host, status, response_headers.get('retry-after'))
+        if status == 200:
+            return text
+        return None
+
+    async def search_with_bing(self, query, timeout=10):
+        """جستجو با بینگ"""
+        html = await self.safe_request(self.bing_search_url + quote_plus(query), timeout)
+        return parse_bing_results(html) if html else None
+
+    async def search_with_duckduckgo(self, query, timeout=10):
+        """جستجو با داک‌داک‌گو"""
+        html = await self.safe_request(self.duckduckgo_search_url + quote_plus(query), timeout)
+        return parse_duckduckgo_results(html) if html else None
+
+    async def search_with_engine(self, engine_url, query, timeout=10):
+        """جستجو با یک موتور جایگزین"""
+        html = await self.safe_request(engine_url + quote_plus(query), timeout)
+        if html:
+            results = parse_generic_links(html)
+            if results:
+                return results[:5]
+        return None
+
+    async def _search(self, query, max_results, engine_timeout=None, deadline=None):
+        engine_timeout = engine_timeout or Config.SEARCH_ENGINE_TIMEOUT
+        deadline = deadline or Config.SEARCH_DEADLINE
+
+        merged = []
+        seen_urls = set()
+        end_time = time.monotonic() + deadline
+
+        # همان رده‌های نسخه همگام: موتورهای عمومی فقط وقتی رده اول نتیجه‌ای نداد
+        for engines in self.get_parallel_engines():
+            if merged or time.monotonic() >= end_time:
+                break
+            tier_end = min(end_time, time.monotonic() + engine_timeout)
+            await self._run_tier(engines, query, max_results, engine_timeout, tier_end, merged, seen_urls)
+
+        if merged:
+            return merged[:max_results], False
+        return self.get_mock_results(query), True
+
+    async def _run_tier(self, engines, query, max_results, engine_timeout, tier_end, merged, seen_urls):
+        pending = {asyncio.ensure_future(engine(query, engine_timeout)) for _, engine in engines}
+        try:
+            while pending:
+                remaining = tier_end - time.monotonic()
+                if remaining <= 0:
+                    break
+
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                winner = False
+                for task in done:
+                    if task.cancelled() or task.exception() is not None:
+                        continue
+                    results = task.result() or []
+                    merge_results(merged, seen_urls, results)
+                    if len(results) >= max_results or len(merged) >= max_results:
+                        winner = True
+
+                if winner:
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def search_query(self, query, max_results=5, engine_timeout=None, deadline=None):
+        """جستجوی هم‌زمان در موتورهای هر رده"""
+        results, _ = await self._search(query, max_results, engine_timeout, deadline)
+        return results
+
+    async def search_and_save(self, query, max_results=3):
+        """جستجو و ذخیره با همان کش و لاگ نسخه همگام
+
+        ساختن کش (خواندن فایل نتایج) و ذخیره نتایج (نوشتن و fsync لاگ) روی
+        ترد جداگانه اجرا می‌شوند تا event loop مسدود نشود.
+        """
+        cache = await asyncio.to_thread(get_query_cache)
+        cached = cache.get(query)
+        if cached is not None:
+            return cached[:max_results]
+
+        results, is_mock = await self._search(query, max_results)
+        if results:
+            await asyncio.to_thread(self.save_to_dictionary, query, results)
+            if not is_mock:
+                cache.put(query, results)
+            return results
+
+        return []
+
+    async def close(self):
+        await self.client.close()
+
+# یک جستجوگر برای هر event loop، چون اتصال‌ها به loop وابسته‌اند
+_searchers = weakref.WeakKeyDictionary()
+
+def get_async_searcher():
+    """جستجوگر مشترک event loop جاری"""
+    loop = asyncio.get_running_loop()
+    searcher = _searchers.get(loop)
+    if searcher is None:
+        searcher = _searchers[loop] = AsyncSafeWebSearcher()
+    return searcher
+
+async def search_and_save(query, max_results=3):
+    return await get_async_searcher().search_and_save(query, max_results)
@@ -2,9 +2,15 @@
 import random
 import datetime
 import os
-from utils import FileUtils
+from utils import FileUtils, topic_paths
 from config import Config
-from search import search_and_save
+from archive_writer import get_archive_writer
+from storage import get_store
+from archive_format import encode_record, make_record
+from keyword_matcher import KeywordMatcher
+from rule_engine import RuleEngine
+import tracing
+from search import search_and_save_stream
 
 class AutoResponder:
     """کلاس پاسخ‌دهنده خودکار به پیام‌های کاربر"""
@@ -23,75 +29,109 @@ class AutoResponder:
         "خب، این رو فهمیدم. چی دیگه؟"
     ]
     
+    SEARCH_KEYWORDS = [
+        "چیست", "کیست", "چطور", "چگونه", "راهنمایی", 
+        "اطلاعات", "درباره", "معنی", "تعریف", "آموزش",
+        "یادگیری", "کمک", "راهنمایی", "پیدا کن", "جستجو",
+        "سرچ", "search", "find", "what is", "how to"
+    ]
+    
+    # جدول‌ها یک بار هنگام بارگذاری ماژول کامپایل می‌شوند
+    SEARCH_MATCHER = KeywordMatcher(SEARCH_KEYWORDS)
+    
+    # قاعده‌های پاسخ از Config.RESPONSE_RULES_PATH؛ جدول‌های بالا فقط پشتیبان‌اند
+    RULE_ENGINE = RuleEngine(templates=RESPONSE_TEMPLATES, defaults=DEFAULT_RESPONSES)
+    
     @staticmethod
     def should_search(user_message):
         """تعیین کند آیا باید جستجو انجام شود یا نه"""
-        user_message_lower = user_message.lower()
-        
-        search_keywords = [
-            "چیست", "کیست", "چطور", "چگونه", "راهنمایی", 
-            "اطلاعات", "درباره", "معنی", "تعریف", "آموزش",
-            "یادگیری", "کمک", "راهنمایی", "پیدا کن", "جستجو",
-            "سرچ", "search", "find", "what is", "how to"
-        ]
+        if not Config.AUTO_SEARCH:
+            return False
         
         words = user_message.split()
-        if len(words) > 3 or any(keyword in user_message_lower for keyword in search_keywords):
+        if len(words) > 3 or AutoResponder.SEARCH_MATCHER.search(user_message):
             return True
         
         return False
     
+    @staticmethod
+    def match_template(user_message):
+        """قاعده پاسخی که پیام با آن منطبق است، یا None"""
+        return AutoResponder.RULE_ENGINE.match(user_message)
+    
     @staticmethod
     def generate_response(user_message, topic):
         """تولید پاسخ خودکار بر اساس پیام کاربر"""
-        user_message_lower = user_message.lower()
-        
+        return "".join(AutoResponder.generate_response_stream(user_message, topic))
+    
+    @staticmethod
+    def generate_response_stream(user_message, topic, hits=None):
+        """تولید تدریجی پاسخ؛ هر نتیجه جستجو به محض رسیدن برگردانده می‌شود
+
+        اگر لیست hits داده شود، نتیجه‌های جستجویی که در پاسخ آمده‌اند به آن افزوده می‌شوند.
+        """
         # بررسی آیا باید جستجو انجام شود
         if AutoResponder.should_search(user_message):
-            # انجام جستجو
-            search_results = search_and_save(user_message, max_results=3)
+            # انجام جستجو؛ همه نتایج خوانده می‌شوند تا ذخیره شوند ولی دو تای اول نمایش داده می‌شوند
+            shown = 0
+            for result in search_and_save_stream(user_message, max_results=3):
+                shown += 1
+                if shown > 2:
+                    continue
+                if hits is not None:
+                    hits.append({'title': result.get('title'), 'url': result.get('url')})
+                
+                chunk = f"🔍 درباره '{user_message}' جستجو کردم:\n\n" if shown == 1 else ""
+                chunk += f"{shown}. {result['title']}\n"
+                if result.get('description'):
+                    chunk += f"   {result['description'][:80]}...\n"
+                yield chunk
             
-            if search_results:
-                response = f"🔍 درباره '{user_message}' جستجو کردم:\n\n"
-                for i, result in enumerate(search_results[:2], 1):
-                    response += f"{i}. {result['title']}\n"
-                    if result.get('description'):
-                        response += f"   {result['description'][:80]}...\n"
-                response += "\nبرای جزئیات بیشتر از دکمه 'مشاهده نتایج جستجو' استفاده کنید."
+            if shown:
+                yield "\nبرای جزئیات بیشتر از دکمه 'مشاهده نتایج جستجو' استفاده کنید."
             else:
-                response = f"متأسفم، نتوانستم اطلاعاتی درباره '{user_message}' پیدا کنم."
-            
-            return response
+                yield f"متأسفم، نتوانستم اطلاعاتی درباره '{user_message}' پیدا کنم."
+            return
         
-        # پاسخ‌های معمولی بر اساس کلمات کلیدی
-        for keyword, responses in AutoResponder.RESPONSE_TEMPLATES.items():
-            if keyword in user_message_lower:
-                return random.choice(responses)
-        
-        return random.choice(AutoResponder.DEFAULT_RESPONSES)
+        # پاسخ‌های معمولی از موتور قاعده‌ها؛ فایل قاعده‌ها با تغییر دوباره خوانده می‌شود
+        yield AutoResponder.RULE_ENGINE.respond(user_message)
     
     @staticmethod
     def generate_response_filename(topic):
         """تولید نام فایل برای بایگانی پاسخ‌ها"""
-        now = datetime.datetime.now()
-        date_part = now.strftime("%Y-%m-%d_%H-%M")
-        sanitized_topic = FileUtils.sanitize_filename(topic)
-        filename = f"response_{date_part}_{sanitized_topic}.txt"
-        return os.path.join(Config.get_response_folder(), filename)
+        return topic_paths.resolve(topic)[1]
     
     @staticmethod
     def process_message(user_message, topic):
         """پردازش پیام کاربر و تولید پاسخ"""
-        response = AutoResponder.generate_response(user_message, topic)
-        response_filename = AutoResponder.generate_response_filename(topic)
-        
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        try:
-            with open(response_filename, "a", encoding="utf-8") as file:
-                file.write(f"[{timestamp}] کاربر: {user_message}\n")
-                file.write(f"[{timestamp}] ربات: {response}\n")
-                file.write("-" * 50 + "\n")
-        except Exception as e:
-            print(f"خطا در ذخیره پاسخ: {e}")
-        
-        return response
\ No newline at end of file
+        return "".join(AutoResponder.process_message_stream(user_message, topic))
+    
+    @staticmethod
+    def process_message_stream(user_message, topic):
+        """پردازش تدریجی پیام؛ پاسخ کامل پس از آخرین تکه بایگانی می‌شود"""
+        with tracing.trace("message", topic=topic, length=len(user_message)):
+            parts = []
+            hits = []
+            with tracing.span("generate"):
+                for chunk in AutoResponder.generate_response_stream(user_message, topic, hits):
+                    parts.append(chunk)
+                    yield chunk
+            
+            response = "".join(parts)
+            timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            try:
+                store = get_store()
+                sanitized_topic = FileUtils.sanitize_filename(topic)
+                with tracing.span("archive_write"):
+                    if store is not None:
+                        store.add_message("response", sanitized_topic, "user", user_message, timestamp)
+                        store.add_message("response", sanitized_topic, "bot", response, timestamp)
+                    else:
+                        # دو رکورد با هم در صف نوشتن قرار می‌گیرند تا پشت سر هم بمانند
+                        get_archive_writer().write(
+                            AutoResponder.generate_response_filename(topic),
+                            encode_record(make_record(sanitized_topic, "user", user_message, timestamp))
+                            + encode_record(make_record(sanitized_topic, "bot", response, timestamp, hits))
+                        )
+            except Exception as e:
+                print(f"خطا در ذخیره پاسخ: {e}")
\ No newline at end of file
@@ -0,0 +1,181 @@
+# batch.py
+# اجرای پاسخ‌دهنده خودکار روی فایلی از پیام‌ها بدون رابط گرافیکی
+#
+#   python batch.py messages.jsonl --output replies.jsonl
+#   cat messages.txt | python -m batch - --text --topic پشتیبانی
+import sys
+import json
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from utils import FileUtils
+from auto_responder import AutoResponder
+from archive_writer import get_archive_writer
+import tracing
+import profiler
+
+def read_messages(stream, text_mode=False, default_topic=None):
+    """خواندن پیام‌ها به صورت جریانی؛ هر خط JSON با message و topic اختیاری"""
+    default_topic = default_topic or "جلسه_عمومی"
+    for line_no, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+
+        if text_mode:
+            yield {'id': line_no, 'message': line, 'topic': default_topic}
+            continue
+
+        try:
+            item = json.loads(line)
+        except ValueError as e:
+            yield {'id': line_no, 'error': f"JSON نامعتبر: {e}"}
+            continue
+
+        if isinstance(item, str):
+            item = {'message': item}
+        if not isinstance(item, dict) or not item.get('message'):
+            yield {'id': line_no, 'error': "فیلد message وجود ندارد"}
+            continue
+
+        yield {
+            'id': item.get('id', line_no),
+            'message': item['message'],
+            'topic': item.get('topic') or default_topic,
+        }
+
+def process_item(item, archive_user=True):
+    """پردازش یک پیام مثل ارسال از رابط گرافیکی"""
+    if 'error' in item:
+        return dict(item, elapsed_ms=0.0)
+
+    start = time.perf_counter()
+    record = {'id': item['id'], 'topic': item['topic'], 'message': item['message']}
+    try:
+        if archive_user:
+            user_filename = FileUtils.generate_user_filename(item['topic'])
+            FileUtils.save_message_to_file(user_filename, f"کاربر: {item['message']}", item['topic'])
+        record['reply'] = AutoResponder.process_message(item['message'], item['topic'])
+    except Exception as e:
+        record['error'] = str(e)
+    record['elapsed_ms'] = (time.perf_counter() - start) * 1000
+    return record
+
+def percentile(values, percent):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))]
+
+def run_batch(items, output, workers=None, max_pending=None, archive_user=True, progress=0):
+    """اجرای پیام‌ها در استخر ترد؛ خروجی به ترتیب ورودی و با حافظه محدود نوشته می‌شود"""
+    workers = workers or Config.RESPONDER_WORKERS
+    max_pending = max_pending or workers * 4
+
+    latencies = []
+    errors = 0
+    window = deque()
+    start = time.perf_counter()
+
+    def write_next():
+        nonlocal errors
+        record = window.popleft().result()
+        if 'error' in record:
+            errors += 1
+        else:
+            latencies.append(record['elapsed_ms'])
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        count = len(latencies) + errors
+        if progress and count % progress == 0:
+            elapsed = time.perf_counter() - start
+            print(f"{count} پیام، {count / elapsed:.1f} پیام در ثانیه", file=sys.stderr)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as executor:
+        for item in items:
+            # تعداد پیام‌های در جریان محدود است تا ورودی بزرگ کامل در حافظه نیاید
+            if len(window) >= max_pending:
+                write_next()
+            window.append(executor.submit(process_item, item, archive_user))
+        while window:
+            write_next()
+
+    output.flush()
+    get_archive_writer().flush()
+    elapsed = time.perf_counter() - start
+    total = len(latencies) + errors
+    return {
+        'messages': total,
+        'errors': errors,
+        'elapsed_seconds': elapsed,
+        'throughput_per_second': total / elapsed if elapsed else 0.0,
+        'latency_ms': {
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+        },
+    }
+
+def print_report(report):
+    latency = report['latency_ms']
+    print(
+        f"✅ {report['messages']} پیام ({report['errors']} خطا) در {report['elapsed_seconds']:.2f} ثانیه، "
+        f"{report['throughput_per_second']:.1f} پیام در ثانیه؛ "
+        f"p50={latency['p50']:.1f}ms p95={latency['p95']:.1f}ms p99={latency['p99']:.1f}ms",
+        file=sys.stderr
+    )
+    for name, stage in report.get('stages', {}).items():
+        print(f"   {name:<20}{stage['count']:>8}  mean={stage['mean_ms']:.1f}ms p95≤{stage['p95_ms']:g}ms",
+              file=sys.stderr)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="پردازش دسته‌ای پیام‌ها با پاسخ‌دهنده خودکار")
+    parser.add_argument("input", nargs="?", default="-", help="فایل JSON-Lines پیام‌ها یا - برای ورودی استاندارد")
+    parser.add_argument("--output", "-o", default="-", help="فایل خروجی JSON-Lines یا - برای خروجی استاندارد")
+    parser.add_argument("--text", action="store_true", help="هر خط ورودی یک پیام متنی ساده است")
+    parser.add_argument("--topic", help="موضوع پیش‌فرض پیام‌هایی که topic ندارند")
+    parser.add_argument("--workers", type=int, default=Config.RESPONDER_WORKERS)
+    parser.add_argument("--max-pending", type=int, help="حداکثر پیام‌های در جریان (پیش‌فرض: چهار برابر workers)")
+    parser.add_argument("--no-search", action="store_true", help="بدون جستجوی اینترنتی، برای سنجش بار")
+    parser.add_argument("--no-user-archive", action="store_true", help="پیام‌های کاربر در بایگانی کاربر ذخیره نشوند")
+    parser.add_argument("--progress", type=int, default=0, help="گزارش پیشرفت پس از هر N پیام")
+    parser.add_argument("--report-json", help="ذخیره گزارش توان عملیاتی در فایل JSON")
+    parser.add_argument("--trace", nargs="?", const="", metavar="FILE",
+                        help="زمان‌سنجی مراحل؛ با FILE هر ردیابی در آن فایل نوشته می‌شود")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="پروفایل نمونه‌بردار؛ FILE با پسوند .json برای speedscope و بقیه collapsed")
+    args = parser.parse_args(argv)
+
+    if args.no_search:
+        Config.AUTO_SEARCH = False
+    if args.trace is not None:
+        tracing.enable(args.trace or None)
+
+    if args.profile:
+        profiler.start_profiler(args.profile)
+
+    source = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        items = read_messages(source, args.text, args.topic)
+        report = run_batch(items, output, args.workers, args.max_pending,
+                           not args.no_user_archive, args.progress)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+        if args.profile:
+            print(f"پروفایل در {profiler.stop_profiler()} ذخیره شد", file=sys.stderr)
+
+    if tracing.is_enabled():
+        report['stages'] = tracing.histograms()
+    print_report(report)
+    if args.report_json:
+        with open(args.report_json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 1 if report['errors'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
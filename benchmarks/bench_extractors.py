@@ -0,0 +1,63 @@
+# bench_extractors.py
+# سنجش زمان استخراج نتایج برای هر پشتیبان روی صفحه‌های ذخیره شده
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractors import available_backends, extract_bing, extract_duckduckgo, extract_links
+
+FIXTURES_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# صفحه ذخیره شده و تابع استخراج مربوط به آن
+PAGES = [
+    ("bing.html", extract_bing),
+    ("duckduckgo.html", extract_duckduckgo),
+    ("bing.html", extract_links),
+    ("yahoo.html", extract_links),
+]
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_FOLDER, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+def time_backend(extract, html, backend, repeat):
+    """میانگین زمان هر بار استخراج به میلی‌ثانیه"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        extract(html, backend)
+    return (time.perf_counter() - start) * 1000 / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description="سنجش سرعت پشتیبان‌های استخراج HTML")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    backends = available_backends()
+    reference = "bs4" if "bs4" in backends else backends[0]
+    failed = False
+
+    print(f"{'صفحه':<28}" + "".join(f"{b:>12}" for b in backends))
+    for name, extract in PAGES:
+        html = load_fixture(name)
+        expected = extract(html, reference)
+
+        row = f"{name + ' / ' + extract.__name__:<28}"
+        for backend in backends:
+            if extract(html, backend) != expected:
+                failed = True
+                row += f"{'MISMATCH':>12}"
+                continue
+            row += f"{time_backend(extract, html, backend, args.repeat):>10.2f}ms"
+        print(row)
+
+    if failed:
+        print(f"❌ خروجی برخی پشتیبان‌ها با {reference} یکسان نیست")
+        return 1
+    print(f"✅ خروجی همه پشتیبان‌ها با {reference} یکسان است")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+# bench_search.py
+# سنجش کل مسیر search_and_save بدون اینترنت، با پاسخ‌های ضبط شده موتورها
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import search
+import tracing
+from config import Config
+from rate_limiter import HostRateLimiter
+
+FIXTURES_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# مسیر هر موتور روی سرور محلی و صفحه ضبط شده آن
+ROUTES = {
+    "/bing": "bing.html",
+    "/duckduckgo": "duckduckgo.html",
+    "/yahoo": "yahoo.html",
+}
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """پاسخ دادن صفحه‌های ضبط شده با تأخیر و خطای قابل تنظیم"""
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        route = self.path.split("?", 1)[0].rstrip("/")
+        body = server.pages.get(route)
+
+        delay = max(0.0, random.gauss(server.latency, server.jitter))
+        time.sleep(delay)
+
+        if body is None:
+            self.send_error_response(404)
+        elif random.random() < server.error_rate:
+            self.send_error_response(server.error_status)
+        else:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def send_error_response(self, status):
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+def start_replay_server(latency, jitter, error_rate, error_status):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ReplayHandler)
+    server.daemon_threads = True
+    server.pages = {}
+    for route, name in ROUTES.items():
+        with open(os.path.join(FIXTURES_FOLDER, name), "rb") as f:
+            server.pages[route] = f.read()
+    server.latency = latency
+    server.jitter = jitter
+    server.error_rate = error_rate
+    server.error_status = error_status
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def percentile(values, percent):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def summarize(values):
+    """خلاصه زمان‌ها به میلی‌ثانیه"""
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50) * 1000,
+        "p95": percentile(values, 95) * 1000,
+        "p99": percentile(values, 99) * 1000,
+    }
+
+def timed(samples, key, func):
+    """پوشاندن تابع برای ثبت زمان هر فراخوانی"""
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            samples.setdefault(key, []).append(time.perf_counter() - start)
+    return wrapper
+
+def create_searcher(base_url):
+    """جستجوگری که به جای موتورهای واقعی به سرور محلی وصل می‌شود"""
+    searcher = search.SafeWebSearcher()
+    searcher.bing_search_url = f"{base_url}/bing?q="
+    searcher.duckduckgo_search_url = f"{base_url}/duckduckgo?q="
+    searcher.search_engines = [f"{base_url}/yahoo?p="]
+    searcher.rate_limiter = HostRateLimiter(rate=10000, burst=10000)
+    return searcher
+
+def run_benchmark(args):
+    server = start_replay_server(args.latency / 1000, args.jitter / 1000, args.error_rate, args.error_status)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    Config.SEARCH_PARALLEL = not args.sequential
+
+    samples = {}
+    originals = {
+        name: getattr(search, name)
+        for name in ("parse_bing_results", "parse_duckduckgo_results", "parse_generic_links")
+    }
+    for name, func in originals.items():
+        setattr(search, name, timed(samples, name, func))
+
+    searcher = create_searcher(base_url)
+    searcher.save_to_dictionary = timed(samples, "persist", searcher.save_to_dictionary)
+
+    # فایل‌های نتایج در پوشه موقت نوشته می‌شوند تا داده واقعی دست نخورد
+    previous_dir = os.getcwd()
+    work_dir = tempfile.mkdtemp(prefix="bench_search_")
+    os.chdir(work_dir)
+    try:
+        for i in range(args.warmup):
+            search.search_and_save(f"warmup {i}", args.max_results, searcher=searcher)
+        samples.clear()
+
+        start = time.perf_counter()
+        for i in range(args.queries):
+            query_start = time.perf_counter()
+            search.search_and_save(f"benchmark query {i}", args.max_results, searcher=searcher)
+            samples.setdefault("search_and_save", []).append(time.perf_counter() - query_start)
+        elapsed = time.perf_counter() - start
+        connections = searcher.connection_stats()
+    finally:
+        os.chdir(previous_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+        for name, func in originals.items():
+            setattr(search, name, func)
+        searcher.close()
+        server.shutdown()
+
+    report = {name: summarize(values) for name, values in samples.items()}
+    report["throughput_per_second"] = args.queries / elapsed if elapsed else 0.0
+    report["connections"] = connections
+    return report
+
+def check_tracing(args):
+    """مقایسه موتورهای رده موازی با ردیابی خاموش و روشن؛ نتیجه‌ها باید یکسان باشند"""
+    server = start_replay_server(args.latency / 1000, args.jitter / 1000, 0.0, args.error_status)
+    searcher = create_searcher(f"http://127.0.0.1:{server.server_port}")
+    was_enabled = tracing.is_enabled()
+
+    def engines_with_results():
+        ran = []
+        def record(name, engine):
+            def run(query, timeout):
+                results = engine(query, timeout)
+                if results:
+                    ran.append(name)
+                return results
+            return run
+
+        # همان مسیر iter_search_parallel، بدون توقف پس از اولین برنده
+        engines = [(name, record(name, engine)) for name, engine in searcher.get_parallel_engines()[0]]
+        end_time = time.monotonic() + Config.SEARCH_DEADLINE
+        list(searcher._run_tier(engines, "tracing check", 1000, Config.SEARCH_ENGINE_TIMEOUT, end_time, [], set()))
+        return sorted(ran)
+
+    try:
+        tracing.disable()
+        without = engines_with_results()
+        tracing.enable()
+        with tracing.trace("tracing_check"):
+            with_tracing = engines_with_results()
+    finally:
+        if not was_enabled:
+            tracing.disable()
+        searcher.close()
+        server.shutdown()
+
+    print(f"بدون ردیابی: {without}  با ردیابی: {with_tracing}")
+    return without == with_tracing
+
+def print_report(report):
+    print(f"{'مرحله':<28}{'count':>8}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, stats in report.items():
+        if isinstance(stats, dict) and "p50" in stats:
+            print(f"{name:<28}{stats['count']:>8}{stats['p50']:>8.2f}ms{stats['p95']:>8.2f}ms{stats['p99']:>8.2f}ms")
+    print(f"توان عملیاتی: {report['throughput_per_second']:.1f} جستجو در ثانیه")
+    print(f"اتصال‌ها: {report['connections']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="سنجش آفلاین مسیر جستجو با پاسخ‌های ضبط شده")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--max-results", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=50, help="تأخیر میانگین سرور (میلی‌ثانیه)")
+    parser.add_argument("--jitter", type=float, default=10, help="انحراف معیار تأخیر (میلی‌ثانیه)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="نسبت پاسخ‌های خطا بین 0 و 1")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--sequential", action="store_true", help="اجرای موتورها به صورت ترتیبی")
+    parser.add_argument("--json", help="ذخیره گزارش در فایل JSON")
+    parser.add_argument("--max-p95", type=float, help="خطا اگر p95 کل مسیر از این مقدار (میلی‌ثانیه) بیشتر شود")
+    parser.add_argument("--check-tracing", action="store_true",
+                        help="فقط بررسی اینکه ردیابی موتورهای اجرا شده در حالت موازی را تغییر نمی‌دهد")
+    args = parser.parse_args()
+
+    if args.check_tracing:
+        if not check_tracing(args):
+            print("❌ ردیابی موتورهای اجرا شده را تغییر داد")
+            return 1
+        return 0
+
+    report = run_benchmark(args)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.max_p95 is not None and report["search_and_save"]["p95"] > args.max_p95:
+        print(f"❌ p95 از حد {args.max_p95}ms بیشتر است")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,16 +9,120 @@ class Config:
     RESPONSE_FOLDER = "response_archives"
     FONT_FAMILY = "Arial"
     
+    # تنظیمات اجرای پاسخ‌دهنده در پس‌زمینه
+    RESPONDER_WORKERS = 4
+    RESPONDER_MAX_PENDING = 16
+    RESPONSE_POLL_MS = 100
+    
+    # حداکثر خط‌های نگه داشته شده در چت و تعداد خط‌هایی که یک‌جا حذف می‌شوند
+    CHAT_SCROLLBACK_LINES = 2000
+    CHAT_EVICT_CHUNK = 500
+    CHAT_FLUSH_MS = 16
+    
+    # جستجوی خودکار در اینترنت برای پیام‌های پرسشی
+    AUTO_SEARCH = True
+    
+    # سرویس HTTP محلی؛ زمان‌ها به ثانیه
+    SERVER_HOST = "127.0.0.1"
+    SERVER_PORT = 8765
+    SERVER_WORKERS = 8
+    SERVER_MAX_QUEUE = 64
+    SERVER_REQUEST_TIMEOUT = 30
+    SERVER_MAX_BODY = 64 * 1024
+    
+    # زمان‌سنجی مراحل پردازش پیام؛ TRACE_FILE برای ذخیره هر ردیابی به صورت JSON-Lines
+    TRACING_ENABLED = False
+    TRACE_FILE = None
+    
+    # پروفایلر نمونه‌بردار؛ قالب خروجی speedscope یا collapsed
+    PROFILER_INTERVAL = 0.01
+    PROFILER_FORMAT = "speedscope"
+    PROFILER_FOLDER = "profiles"
+    
+    # حافظه نام فایل‌های هر موضوع و تأخیر به روز رسانی نام فایل هنگام تایپ
+    TOPIC_CACHE_SIZE = 1024
+    TOPIC_DEBOUNCE_MS = 150
+    
+    # فایل قاعده‌های پاسخ خودکار
+    RESPONSE_RULES_PATH = "response_rules.json"
+    
+    # محل ذخیره پیام‌ها و نتایج جستجو: files (بایگانی متنی و search_results.json) یا sqlite
+    STORAGE_BACKEND = "files"
+    STORAGE_DB_PATH = "art.db"
+    STORAGE_BATCH_SIZE = 200
+    STORAGE_FLUSH_INTERVAL = 0.5
+    
+    # تنظیمات کش نتایج جستجو
+    SEARCH_CACHE_TTL = 6 * 60 * 60
+    SEARCH_CACHE_MAX_ENTRIES = 500
+    SEARCH_CACHE_MAX_BYTES = 4 * 1024 * 1024
+    
+    # تنظیمات لاگ افزایشی نتایج جستجو
+    SEARCH_LOG_COMPACT_BYTES = 8 * 1024 * 1024
+    SEARCH_LOG_FSYNC = False
+    
+    # حداکثر اتصال باز به ازای هر موتور جستجو
+    HTTP_POOL_MAXSIZE = 4
+    
+    # جستجوی موازی در چند موتور؛ زمان‌ها به ثانیه
+    SEARCH_PARALLEL = True
+    SEARCH_FANOUT_WORKERS = 8
+    SEARCH_ENGINE_TIMEOUT = 8
+    SEARCH_DEADLINE = 12
+    ASYNC_SEARCH_CONCURRENCY = 100
+    
+    # پشتیبان استخراج HTML: auto (lxml در صورت نصب بودن)، lxml، stream یا bs4
+    HTML_EXTRACTOR = "auto"
+    
+    # محدودیت نرخ درخواست به ازای هر میزبان (درخواست در ثانیه)
+    RATE_LIMIT_PER_SECOND = 0.5
+    RATE_LIMIT_BURST = 3
+    RATE_LIMIT_MIN_PER_SECOND = 0.05
+    RATE_LIMIT_RECOVERY_STEP = 0.1
+    RATE_LIMIT_MAX_BACKOFF = 60
+    
+    # نوشتن دسته‌ای بایگانی‌ها؛ سیاست fsync: never، batch یا interval
+    ARCHIVE_FLUSH_BYTES = 64 * 1024
+    ARCHIVE_FLUSH_INTERVAL = 1.0
+    ARCHIVE_FSYNC_POLICY = "never"
+    ARCHIVE_FSYNC_INTERVAL = 5.0
+    ARCHIVE_MAX_OPEN_FILES = 32
+    
+    # قطعه‌بندی بایگانی هر موضوع؛ فشرده‌سازی: auto (zstd در صورت نصب بودن)، zstd، gzip یا none
+    ARCHIVE_SEGMENT_MAX_BYTES = 4 * 1024 * 1024
+    ARCHIVE_SEGMENT_MAX_AGE = 24 * 60 * 60
+    ARCHIVE_COMPRESSION = "auto"
+    
+    # دنبال کردن زنده بایگانی‌ها؛ حتی با inotify هر FOLLOW_MAX_WAIT ثانیه یک بار بررسی می‌شود
+    FOLLOW_POLL_INTERVAL = 0.5
+    FOLLOW_MAX_WAIT = 5.0
+    
+    # نمایه متنی بایگانی‌ها
+    ARCHIVE_INDEX_PATH = "archive_index.db"
+    ARCHIVE_SEARCH_LIMIT = 50
+    
+    # نمایش پنجره‌ای بایگانی‌های بزرگ
+    ARCHIVE_VIEW_MARGIN = 200
+    ARCHIVE_VIEW_SCAN_BYTES = 16 * 1024 * 1024
+    ARCHIVE_VIEW_TAIL_MS = 1000
+    
+    # پوشه‌هایی که وجودشان یک بار بررسی شده است
+    _ready_folders = set()
+    
     @staticmethod
     def get_archive_folder():
         """دریافت مسیر پوشه بایگانی کاربر"""
-        if not os.path.exists(Config.ARCHIVE_FOLDER):
-            os.makedirs(Config.ARCHIVE_FOLDER)
-        return Config.ARCHIVE_FOLDER
+        return Config._ensure_folder(Config.ARCHIVE_FOLDER)
     
     @staticmethod
     def get_response_folder():
         """دریافت مسیر پوشه بایگانی پاسخ‌ها"""
-        if not os.path.exists(Config.RESPONSE_FOLDER):
-            os.makedirs(Config.RESPONSE_FOLDER)
-        return Config.RESPONSE_FOLDER
\ No newline at end of file
+        return Config._ensure_folder(Config.RESPONSE_FOLDER)
+    
+    @staticmethod
+    def _ensure_folder(folder):
+        """ساخت پوشه در اولین درخواست؛ دفعات بعد بدون فراخوانی سیستمی"""
+        if folder not in Config._ready_folders:
+            os.makedirs(folder, exist_ok=True)
+            Config._ready_folders.add(folder)
+        return folder
\ No newline at end of file
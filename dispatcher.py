@@ -0,0 +1,161 @@
+# dispatcher.py
+import queue
+import threading
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from auto_responder import AutoResponder
+
+class ResponseDispatcher:
+    """اجرای پاسخ‌دهنده خودکار در یک استخر ترد محدود، خارج از ترد اصلی Tk"""
+
+    def __init__(self, max_workers=None, max_pending=None, process=None, streaming=False):
+        self.max_workers = max_workers or Config.RESPONDER_WORKERS
+        self.max_pending = max_pending or Config.RESPONDER_MAX_PENDING
+        # در حالت تدریجی process یک generator برمی‌گرداند و هر تکه جداگانه تحویل می‌شود
+        self.streaming = streaming
+        if process is None:
+            process = AutoResponder.process_message_stream if streaming else AutoResponder.process_message
+        self.process = process
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="responder"
+        )
+        # صف نتایج که ترد اصلی با root.after آن را می‌خواند
+        self.results = queue.Queue()
+
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        # کارهای در استخر تا پایان واقعی اجرا شمرده می‌شوند، حتی اگر لغو شده باشند
+        self._futures = {}
+        self._topics = {}
+        self._topic_order = {}
+        self._finished = {}
+        self._buffered = {}
+
+    def submit(self, message, topic):
+        """ارسال پیام به استخر؛ در صورت پر بودن صف None برمی‌گرداند"""
+        with self._lock:
+            if len(self._futures) >= self.max_pending:
+                return None
+
+            ticket = next(self._ids)
+            self._topics[ticket] = topic
+            self._topic_order.setdefault(topic, deque()).append(ticket)
+            future = self._futures[ticket] = self.executor.submit(self._run, ticket, message, topic)
+        # خارج از قفل، چون برای کار تمام شده callback همین جا اجرا می‌شود
+        future.add_done_callback(lambda _, ticket=ticket: self._release(ticket))
+        return ticket
+
+    def _release(self, ticket):
+        with self._lock:
+            self._futures.pop(ticket, None)
+
+    def _run(self, ticket, message, topic):
+        """اجرای پیام در ترد کارگر"""
+        try:
+            if self.streaming:
+                response = self._run_stream(ticket, message, topic)
+                if response is None:
+                    return
+            else:
+                response = self.process(message, topic)
+            self._complete(ticket, "result", response)
+        except Exception as e:
+            self._complete(ticket, "error", str(e))
+
+    def _run_stream(self, ticket, message, topic):
+        """تحویل تکه‌های پاسخ؛ اگر پیام لغو شود None برمی‌گرداند"""
+        parts = []
+        chunks = self.process(message, topic)
+        try:
+            for chunk in chunks:
+                parts.append(chunk)
+                if not self._emit(ticket, "chunk", chunk):
+                    return None
+        finally:
+            chunks.close()
+        return "".join(parts)
+
+    def _emit(self, ticket, kind, payload):
+        """تحویل یک تکه میانی؛ اگر پیام لغو شده باشد False برمی‌گرداند"""
+        with self._lock:
+            topic = self._topics.get(ticket)
+            if topic is None or ticket in self._finished:
+                return False
+
+            # تکه‌های پیامی که هنوز نوبتش نرسیده نگه داشته می‌شوند
+            if self._topic_order[topic][0] == ticket:
+                self.results.put((ticket, topic, kind, payload))
+            else:
+                self._buffered.setdefault(ticket, []).append((kind, payload))
+            return True
+
+    def _complete(self, ticket, kind, payload):
+        """ثبت نتیجه و تحویل به ترتیب ارسال در هر موضوع"""
+        with self._lock:
+            topic = self._topics.get(ticket)
+            if topic is None or ticket in self._finished:
+                return
+
+            self._finished[ticket] = (kind, payload)
+            if kind == "cancelled":
+                self._buffered.pop(ticket, None)
+
+            # پاسخ‌ها فقط وقتی تحویل داده می‌شوند که پاسخ‌های قبلی همان موضوع آماده باشند
+            order = self._topic_order[topic]
+            while order and order[0] in self._finished:
+                ready = order.popleft()
+                self._flush_buffered(ready, topic)
+                ready_kind, ready_payload = self._finished.pop(ready)
+                del self._topics[ready]
+                self.results.put((ready, topic, ready_kind, ready_payload))
+
+            if order:
+                self._flush_buffered(order[0], topic)
+            else:
+                del self._topic_order[topic]
+
+    def _flush_buffered(self, ticket, topic):
+        for kind, payload in self._buffered.pop(ticket, ()):
+            self.results.put((ticket, topic, kind, payload))
+
+    def cancel(self, ticket):
+        """لغو یک پیام؛ اگر در حال اجرا باشد نتیجه آن دور ریخته می‌شود
+
+        کار در حال اجرا متوقف نمی‌شود و تا پایانش در max_pending شمرده می‌شود.
+        """
+        with self._lock:
+            future = self._futures.get(ticket)
+            if future is None or ticket not in self._topics:
+                return False
+
+        future.cancel()
+        self._complete(ticket, "cancelled", None)
+        return True
+
+    def cancel_all(self):
+        """لغو همه پیام‌های در جریان"""
+        with self._lock:
+            tickets = list(self._topics)
+        return sum(1 for ticket in tickets if self.cancel(ticket))
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._futures)
+
+    def poll(self, max_items=50):
+        """دریافت نتایج آماده بدون مسدود کردن"""
+        items = []
+        while len(items) < max_items:
+            try:
+                items.append(self.results.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def shutdown(self):
+        """توقف استخر و لغو کارهای باقی‌مانده"""
+        self.cancel_all()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,278 @@
+# extractors.py
+from html.parser import HTMLParser
+from html.entities import html5, name2codepoint
+from config import Config
+
+try:
+    import lxml.html
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+try:
+    from bs4 import BeautifulSoup
+    BS4_AVAILABLE = True
+except ImportError:
+    BS4_AVAILABLE = False
+
+# عناصری که در BeautifulSoup تگ بسته شدن ندارند
+_VOID_ELEMENTS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen',
+    'link', 'menuitem', 'meta', 'param', 'source', 'track', 'wbr',
+    'basefont', 'bgsound', 'command', 'frame', 'image', 'isindex',
+    'nextid', 'spacer'
+])
+
+# متن این عناصر در get_text شمرده نمی‌شود
+_HIDDEN_TEXT_ELEMENTS = frozenset(['script', 'style', 'template', 'rt', 'rp'])
+
+# قواعد استخراج: ظرف نتیجه و فیلدهایی که از اولین عنصر منطبق در آن گرفته می‌شوند
+BING_RULES = {
+    'container': ('li', 'b_algo'),
+    'fields': {
+        'title': ('h2', None),
+        'link': ('a', None),
+        'description': ('p', None),
+    },
+}
+
+DUCKDUCKGO_RULES = {
+    'container': ('div', 'result'),
+    'fields': {
+        'title': ('a', 'result__a'),
+        'link': ('a', 'result__a'),
+        'description': ('a', 'result__snippet'),
+    },
+}
+
+def _has_class(attrs, class_name):
+    if class_name is None:
+        return True
+    value = attrs.get('class') or ''
+    return value == class_name or class_name in value.split()
+
+class StreamingResultParser(HTMLParser):
+    """پارسر جریانی که به جای ساختن کل درخت، فقط فیلدهای ظرف‌های نتیجه را نگه می‌دارد
+
+    رفتار تودرتویی تگ‌ها مثل سازنده html.parser در BeautifulSoup است تا خروجی
+    یکسان بماند: تگ بسته شدن تا نزدیک‌ترین تگ باز هم‌نام را می‌بندد و عناصر
+    خالی هرگز باز نمی‌مانند.
+    """
+
+    def __init__(self, container, fields=None, require_href=False):
+        super().__init__(convert_charrefs=False)
+        self.container_tag, self.container_class = container
+        self.fields = fields or {}
+        self.require_href = require_href
+
+        self.stack = []
+        self.hidden_depth = 0
+        self.open_containers = []
+        self.captures = []
+        self.containers = []
+
+    def handle_starttag(self, tag, attrs):
+        self._start(tag, attrs)
+        if tag in _VOID_ELEMENTS:
+            self._end(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self._start(tag, attrs)
+        self._end(tag)
+
+    def handle_endtag(self, tag):
+        if tag not in _VOID_ELEMENTS:
+            self._end(tag)
+
+    def _start(self, tag, attrs):
+        attrs = {name: value if value is not None else '' for name, value in attrs}
+        self.stack.append(tag)
+        depth = len(self.stack)
+        if tag in _HIDDEN_TEXT_ELEMENTS:
+            self.hidden_depth += 1
+
+        for container in self.open_containers:
+            values = container['fields']
+            for name, (field_tag, field_class) in self.fields.items():
+                if name not in values and tag == field_tag and _has_class(attrs, field_class):
+                    values[name] = {'href': attrs.get('href', ''), 'text': []}
+                    self.captures.append((depth, values[name]['text']))
+
+        if (tag == self.container_tag and _has_class(attrs, self.container_class)
+                and (not self.require_href or 'href' in attrs)):
+            container = {'depth': depth, 'href': attrs.get('href', ''), 'text': [], 'fields': {}}
+            self.containers.append(container)
+            self.open_containers.append(container)
+            self.captures.append((depth, container['text']))
+
+    def _end(self, tag):
+        if tag not in self.stack:
+            return
+
+        while self.stack:
+            closed = self.stack.pop()
+            if closed in _HIDDEN_TEXT_ELEMENTS:
+                self.hidden_depth -= 1
+            if closed == tag:
+                break
+
+        depth = len(self.stack)
+        while self.captures and self.captures[-1][0] > depth:
+            self.captures.pop()
+        while self.open_containers and self.open_containers[-1]['depth'] > depth:
+            self.open_containers.pop()
+
+    def handle_data(self, data):
+        if self.captures and not self.hidden_depth:
+            for _, buffer in self.captures:
+                buffer.append(data)
+
+    def handle_charref(self, name):
+        # همان تبدیل BeautifulSoup: کدهای زیر 256 با windows-1252 خوانده می‌شوند
+        try:
+            codepoint = int(name[1:], 16) if name[:1] in ('x', 'X') else int(name)
+        except ValueError:
+            return
+        data = None
+        if codepoint < 256:
+            try:
+                data = bytearray([codepoint]).decode('windows-1252')
+            except UnicodeDecodeError:
+                pass
+        if not data:
+            try:
+                data = chr(codepoint)
+            except (ValueError, OverflowError):
+                pass
+        self.handle_data(data or "\N{REPLACEMENT CHARACTER}")
+
+    def handle_entityref(self, name):
+        character = html5.get(name + ';')
+        if character is None and name in name2codepoint:
+            character = chr(name2codepoint[name])
+        self.handle_data(character if character is not None else f"&{name}")
+
+    def unknown_decl(self, data):
+        if data.upper().startswith('CDATA['):
+            self.handle_data(data[len('CDATA['):])
+
+def _stream_results(html, rules):
+    parser = StreamingResultParser(rules['container'], rules['fields'])
+    parser.feed(html)
+    parser.close()
+
+    results = []
+    for container in parser.containers:
+        values = container['fields']
+        title = values.get('title')
+        link = values.get('link')
+        if title and link:
+            desc = values.get('description')
+            results.append({
+                'title': ''.join(title['text']).strip(),
+                'url': link['href'],
+                'description': ''.join(desc['text']).strip() if desc else ''
+            })
+    return results
+
+def _stream_links(html):
+    parser = StreamingResultParser(('a', None), require_href=True)
+    parser.feed(html)
+    parser.close()
+    return [(container['href'], ''.join(container['text'])) for container in parser.containers]
+
+def _lxml_container_xpath(tag, class_name):
+    if class_name is None:
+        return f".//{tag}"
+    return f".//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')]"
+
+def _lxml_document(html):
+    document = lxml.html.document_fromstring(html)
+    # متن اسکریپت و استایل مثل get_text در BeautifulSoup حذف می‌شود
+    for element in document.xpath('//script|//style|//template|//rt|//rp'):
+        element.drop_tree()
+    return document
+
+def _lxml_results(html, rules):
+    document = _lxml_document(html)
+    container_path = _lxml_container_xpath(*rules['container'])
+    field_paths = {name: _lxml_container_xpath(*spec) for name, spec in rules['fields'].items()}
+
+    results = []
+    for container in document.xpath(container_path):
+        values = {}
+        for name, path in field_paths.items():
+            found = container.xpath(path)
+            values[name] = found[0] if found else None
+
+        if values['title'] is not None and values['link'] is not None:
+            desc = values.get('description')
+            results.append({
+                'title': values['title'].text_content().strip(),
+                'url': values['link'].get('href', ''),
+                'description': desc.text_content().strip() if desc is not None else ''
+            })
+    return results
+
+def _lxml_links(html):
+    document = _lxml_document(html)
+    return [(link.get('href', ''), link.text_content()) for link in document.xpath('//a[@href]')]
+
+def _bs4_results(html, rules):
+    soup = BeautifulSoup(html, 'html.parser')
+    container_tag, container_class = rules['container']
+    results = []
+
+    for result in soup.find_all(container_tag, class_=container_class):
+        values = {}
+        for name, (tag, class_name) in rules['fields'].items():
+            values[name] = result.find(tag, class_=class_name) if class_name else result.find(tag)
+
+        if values['title'] and values['link']:
+            desc = values.get('description')
+            results.append({
+                'title': values['title'].get_text().strip(),
+                'url': values['link'].get('href', ''),
+                'description': desc.get_text().strip() if desc else ''
+            })
+    return results
+
+def _bs4_links(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    return [(link.get('href', ''), link.get_text()) for link in soup.find_all('a', href=True)]
+
+BACKENDS = {
+    'stream': (_stream_results, _stream_links),
+    'lxml': (_lxml_results, _lxml_links),
+    'bs4': (_bs4_results, _bs4_links),
+}
+
+def available_backends():
+    """پشتیبان‌هایی که در این محیط قابل استفاده‌اند"""
+    backends = ['stream']
+    if LXML_AVAILABLE:
+        backends.append('lxml')
+    if BS4_AVAILABLE:
+        backends.append('bs4')
+    return backends
+
+def get_backend(name=None):
+    """انتخاب پشتیبان؛ در حالت auto اگر lxml نصب باشد از آن استفاده می‌شود"""
+    name = name or Config.HTML_EXTRACTOR
+    if name == 'auto':
+        name = 'lxml' if LXML_AVAILABLE else 'stream'
+    if name not in available_backends():
+        raise ValueError(f"پشتیبان استخراج نامعتبر یا نصب نشده: {name}")
+    return name
+
+def extract_bing(html, backend=None):
+    """استخراج نتایج از صفحه بینگ"""
+    return BACKENDS[get_backend(backend)][0](html, BING_RULES)
+
+def extract_duckduckgo(html, backend=None):
+    """استخراج نتایج از صفحه داک‌داک‌گو"""
+    return BACKENDS[get_backend(backend)][0](html, DUCKDUCKGO_RULES)
+
+def extract_links(html, backend=None):
+    """همه لینک‌های دارای href به صورت (آدرس، متن)"""
+    return BACKENDS[get_backend(backend)][1](html)
@@ -0,0 +1,272 @@
+# follow.py
+# دنبال کردن زنده گفتگوها از روی قطعه‌های فعال بایگانی
+#
+#   python follow.py --topic پشتیبانی
+#   python follow.py --responses --state follow_state.json --json
+import os
+import sys
+import json
+import time
+import ctypes
+import ctypes.util
+import select
+import argparse
+from collections import namedtuple
+from config import Config
+from segments import ARCHIVE_EXTENSIONS, MANIFEST_NAME, is_compressed, read_segment
+from archive_format import decode_line, encode_record, format_record
+
+# offset آفست بایتی پس از این رکورد در فایل ساده قطعه است و برای ادامه کار کافی است
+FollowEvent = namedtuple("FollowEvent", ["path", "offset", "record"])
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+def _load_libc():
+    """libc با توابع inotify، یا None روی سیستم‌هایی که inotify ندارند"""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+class InotifyWatcher:
+    """بیدار شدن هنگام تغییر فایل‌های یک پوشه با inotify از طریق ctypes
+
+    رویدادها تجزیه نمی‌شوند؛ فقط خبر می‌دهند که باید فایل‌های دنبال شده
+    دوباره بررسی شوند.
+    """
+
+    def __init__(self, libc, folder):
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(folder), mask) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch")
+
+    def wait(self, timeout):
+        """True اگر پیش از پایان timeout تغییری رخ داده باشد"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        try:
+            while os.read(self.fd, 64 * 1024):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher:
+    """جایگزین inotify: هر FOLLOW_POLL_INTERVAL ثانیه یک بار بررسی"""
+
+    def wait(self, timeout):
+        time.sleep(min(timeout, Config.FOLLOW_POLL_INTERVAL))
+        return True
+
+    def close(self):
+        pass
+
+def create_watcher(folder):
+    libc = _load_libc()
+    if libc is not None:
+        try:
+            return InotifyWatcher(libc, folder)
+        except OSError:
+            pass
+    return PollingWatcher()
+
+def load_state(path):
+    """آفست‌های ذخیره شده: {نام فایل قطعه: آفست}"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_state(path, offsets):
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(offsets, f, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+class ArchiveFollower:
+    """دنبال کردن قطعه‌های فعال یک پوشه بایگانی
+
+    فهرست قطعه‌ها از manifest پوشه خوانده می‌شود و فقط وقتی manifest تغییر
+    کند دوباره بارگذاری می‌شود؛ پس قطعه تازه‌ای که پس از پر شدن یا کهنه
+    شدن قطعه قبلی باز می‌شود بدون فهرست کردن پوشه پیدا می‌شود. از هر فایل
+    فقط بایت‌های پس از آفست قبلی خوانده می‌شوند.
+
+    قطعه بسته شده تا وقتی همه خط‌هایش خوانده نشده دنبال می‌شود، حتی اگر در
+    این فاصله فشرده شده باشد.
+    """
+
+    def __init__(self, folder=None, topic=None, offsets=None, from_start=False):
+        self.folder = folder or Config.ARCHIVE_FOLDER
+        self.topic = topic
+        self.from_start = from_start
+        self.manifest_path = os.path.join(self.folder, MANIFEST_NAME)
+        # آفست هر قطعه با نام فایل ساده آن (بدون پسوند فشرده‌سازی)
+        self.offsets = dict(offsets or {})
+        self._segments = {}
+        self._signature = None
+        self._loaded = False
+
+    def refresh_segments(self):
+        """بارگذاری دوباره manifest اگر تغییر کرده باشد"""
+        try:
+            stat = os.stat(self.manifest_path)
+        except OSError:
+            return
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                segments = json.load(f).get('segments', [])
+        except (OSError, ValueError):
+            # manifest در حال جایگزینی است؛ دفعه بعد خوانده می‌شود
+            return
+        self._signature = signature
+
+        first_load, self._loaded = not self._loaded, True
+        self._segments = {}
+        for segment in segments:
+            if self.topic is not None and segment['topic'] != self.topic:
+                continue
+            name = self._plain_name(segment['file'])
+            if not name.endswith(ARCHIVE_EXTENSIONS[0]):
+                continue
+            self._segments[name] = segment
+            if name in self.offsets or segment['end'] is not None:
+                continue
+            # قطعه فعالی که تازه دیده شده: در اولین بارگذاری از انتها (مثل tail)، بعد از ابتدا
+            path = os.path.join(self.folder, name)
+            if first_load and not self.from_start and os.path.exists(path):
+                self.offsets[name] = os.path.getsize(path)
+            else:
+                self.offsets[name] = 0
+
+    @staticmethod
+    def _plain_name(name):
+        return name[:name.rfind(".")] if is_compressed(name) else name
+
+    def poll(self):
+        """رکوردهای کامل تازه همه قطعه‌های دنبال شده"""
+        self.refresh_segments()
+        events = []
+        for name in list(self.offsets):
+            segment = self._segments.get(name)
+            if segment is None:
+                # قطعه‌ای که دیگر در manifest نیست (یا موضوع دیگری دارد)
+                del self.offsets[name]
+                continue
+            events.extend(self._read(name, segment))
+        return events
+
+    def _read(self, name, segment):
+        offset = self.offsets[name]
+        path = os.path.join(self.folder, name)
+        compressed = segment.get('compression')
+        try:
+            if compressed:
+                # قطعه بسته و فشرده شده؛ باقی‌مانده از نسخه فشرده خوانده می‌شود
+                data = read_segment(os.path.join(self.folder, segment['file']))[offset:]
+            else:
+                with open(path, "rb") as f:
+                    f.seek(offset)
+                    data = f.read()
+        except FileNotFoundError:
+            if segment['end'] is not None:
+                # فشرده‌سازی بین خواندن manifest و باز کردن فایل؛ دفعه بعد
+                self._signature = None
+            return []
+
+        events = []
+        end = data.rfind(b"\n") + 1
+        position = 0
+        while position < end:
+            newline = data.index(b"\n", position)
+            record = decode_line(data[position:newline].decode("utf-8", errors="replace"))
+            position = newline + 1
+            if record is not None:
+                events.append(FollowEvent(path, offset + position, record))
+        self.offsets[name] = offset + end
+
+        # قطعه فشرده دیگر تغییر نمی‌کند؛ قطعه بسته فشرده نشده پس از نوشته شدن خط‌های در صف
+        closed_at = segment['end']
+        if compressed or (closed_at and time.time() - closed_at > Config.ARCHIVE_FLUSH_INTERVAL * 4
+                          and end == len(data)):
+            del self.offsets[name]
+        return events
+
+    def follow(self, state_path=None, idle_timeout=None, watcher=None):
+        """تولید کننده FollowEvent برای هر رکورد تازه؛ با idle_timeout پس از بیکاری پایان می‌یابد
+
+        با state_path آفست‌ها پس از هر دسته رکورد ذخیره می‌شوند و اجرای بعدی از
+        همان جا ادامه می‌دهد.
+        """
+        if state_path:
+            self.offsets = {**load_state(state_path), **self.offsets}
+        own_watcher = watcher is None
+        watcher = watcher or create_watcher(self.folder)
+        idle_since = time.monotonic()
+        try:
+            while True:
+                events = self.poll()
+                if events:
+                    idle_since = time.monotonic()
+                    for event in events:
+                        yield event
+                    if state_path:
+                        save_state(state_path, self.offsets)
+                elif idle_timeout is not None and time.monotonic() - idle_since >= idle_timeout:
+                    return
+                watcher.wait(Config.FOLLOW_MAX_WAIT)
+        finally:
+            if own_watcher:
+                watcher.close()
+
+def follow(folder=None, topic=None, state_path=None, from_start=False, idle_timeout=None):
+    """دنبال کردن رکوردهای تازه بایگانی؛ هر رکورد یک FollowEvent است"""
+    follower = ArchiveFollower(folder, topic, from_start=from_start)
+    return follower.follow(state_path, idle_timeout)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="دنبال کردن زنده بایگانی گفتگوها")
+    parser.add_argument("--topic", help="فقط یک موضوع (نام پاک‌سازی شده فایل)")
+    parser.add_argument("--responses", action="store_true", help="بایگانی پاسخ‌ها به جای پیام‌های کاربر")
+    parser.add_argument("--folder", help="پوشه بایگانی دیگر")
+    parser.add_argument("--state", help="فایل ذخیره آفست‌ها برای ادامه پس از اجرای دوباره")
+    parser.add_argument("--from-start", action="store_true", help="قطعه‌های فعال از ابتدا خوانده شوند")
+    parser.add_argument("--json", action="store_true", help="خروجی JSON-Lines به جای متن")
+    parser.add_argument("--idle-exit", type=float, help="پایان پس از این تعداد ثانیه بدون رکورد تازه")
+    args = parser.parse_args(argv)
+
+    folder = args.folder or (Config.RESPONSE_FOLDER if args.responses else Config.ARCHIVE_FOLDER)
+    try:
+        for event in follow(folder, args.topic, args.state, args.from_start, args.idle_exit):
+            if args.json:
+                sys.stdout.write(encode_record(event.record))
+            else:
+                sys.stdout.write(f"{event.record.get('topic')} {format_record(event.record)}\n")
+            sys.stdout.flush()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
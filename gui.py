@@ -0,0 +1,275 @@
+# gui.py
+# پنجره‌ها و ابزارهای Tk؛ جدا از utils تا اجرای بدون نمایشگر (سرور، دسته‌ای) به tkinter نیاز نداشته باشد
+import os
+import tkinter as tk
+from tkinter import scrolledtext
+from tkinter import messagebox
+from config import Config
+from archive_writer import get_archive_writer
+from line_index import LineIndex
+from archive_format import format_line
+
+class GUIUtils:
+    """ابزارهای مربوط به رابط کاربری"""
+    
+    @staticmethod
+    def create_scrolled_text(parent, width, height, font_size=10):
+        """ایجاد جعبه متنی با قابلیت اسکرول"""
+        return scrolledtext.ScrolledText(  # این خط تغییر کرد
+            parent,
+            wrap=tk.WORD,
+            width=width,
+            height=height,
+            font=(Config.FONT_FAMILY, font_size),
+            bg="#f8f9fa"
+        )
+    
+    @staticmethod
+    def create_button(parent, text, command, bg_color, fg_color="white", width=None):
+        """ایجاد دکمه با استایل یکسان"""
+        button = tk.Button(
+            parent,
+            text=text,
+            command=command,
+            font=(Config.FONT_FAMILY, 10),
+            bg=bg_color,
+            fg=fg_color,
+            width=width,
+            relief=tk.RAISED,
+            bd=2
+        )
+        return button
+    
+    @staticmethod
+    def create_entry(parent, font_size=12, width=50):
+        """ایجاد فیلد ورودی"""
+        return tk.Entry(
+            parent,
+            font=(Config.FONT_FAMILY, font_size),
+            width=width,
+            relief=tk.SUNKEN,
+            bd=2
+        )
+    
+    @staticmethod
+    def create_label(parent, text, font_size=10, **kwargs):
+        """ایجاد برچسب"""
+        return tk.Label(
+            parent,
+            text=text,
+            font=(Config.FONT_FAMILY, font_size),
+            **kwargs
+        )
+
+class ArchiveViewer:
+    """کلاس برای نمایش محتوای بایگانی
+    
+    فایل کامل خوانده نمی‌شود: فقط خط‌های پنجره قابل مشاهده به همراه یک حاشیه
+    از روی نمایه آفست خط‌ها در جعبه متنی قرار می‌گیرند و خط‌های تازه انتهای
+    فایل دنبال می‌شوند.
+    """
+    
+    VISIBLE_LINES = 35
+    
+    def __init__(self, parent, filename, title="بایگانی", line_no=None):
+        self.parent = parent
+        self.filename = filename
+        self.title = title
+        self.line_no = line_no
+        self.index = None
+        self.top = max(0, line_no - 1 - self.VISIBLE_LINES // 2) if line_no else 0
+        self.follow = False
+        self.rendered = (0, 0)
+        self.after_id = None
+        self.create_window()
+    
+    def create_window(self):
+        """ایجاد پنجره نمایش بایگانی"""
+        self.window = tk.Toplevel(self.parent)
+        self.window.title(f"{self.title} - {os.path.basename(self.filename)}")
+        self.window.geometry("900x700")
+        self.window.bind("<Destroy>", self.on_destroy)
+        
+        self.create_widgets()
+        self.load_content()
+    
+    def create_widgets(self):
+        """ایجاد ویجت‌های پنجره"""
+        # فریم برای اطلاعات فایل
+        info_frame = tk.Frame(self.window)
+        info_frame.pack(padx=10, pady=5, fill=tk.X)
+        
+        self.file_label = GUIUtils.create_label(info_frame, f"فایل: {self.filename}", 9)
+        self.file_label.pack(anchor=tk.W)
+        self.status_label = GUIUtils.create_label(info_frame, "", 9, fg="gray")
+        self.status_label.pack(anchor=tk.W)
+        
+        # جعبه متنی با نوار اسکرولی که به جای محتوای جعبه، کل فایل را نشان می‌دهد
+        text_frame = tk.Frame(self.window)
+        text_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        self.scrollbar = tk.Scrollbar(text_frame, command=self.on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        self.text_widget = tk.Text(
+            text_frame,
+            wrap=tk.WORD,
+            width=100,
+            height=self.VISIBLE_LINES,
+            font=(Config.FONT_FAMILY, 10),
+            bg="#f8f9fa"
+        )
+        self.text_widget.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.text_widget.tag_config("match", background="#fff3a0")
+        
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.text_widget.bind(sequence, self.on_mouse_wheel)
+        for sequence, action in (("<Prior>", -1), ("<Next>", 1), ("<Up>", "up"), ("<Down>", "down"),
+                                 ("<Control-Home>", "home"), ("<Control-End>", "end")):
+            self.text_widget.bind(sequence, lambda event, action=action: self.on_key(action))
+    
+    def load_content(self):
+        """بارگذاری نمایه خط‌ها و نمایش اولین پنجره"""
+        get_archive_writer().flush(self.filename)
+        try:
+            self.index = LineIndex(self.filename)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("خطا", f"خطا در خواندن فایل: {e}")
+            self.text_widget.config(state=tk.DISABLED)
+            return
+        
+        # خطی که باید نمایش داده شود پیش از اولین رسم نمایه می‌شود
+        while self.index.extend() and self.line_no and len(self.index) < self.line_no:
+            pass
+        self.render()
+        self.after_id = self.window.after(1, self.poll)
+    
+    def poll(self):
+        """ادامه ساخت نمایه و دنبال کردن خط‌های تازه انتهای فایل"""
+        get_archive_writer().flush(self.filename)
+        self.index.refresh()
+        if self.index.path != self.filename:
+            # قطعه فشرده شد؛ ادامه نمایش از نسخه فشرده
+            self.filename = self.index.path
+            self.window.title(f"{self.title} - {os.path.basename(self.filename)}")
+            self.file_label.config(text=f"فایل: {self.filename}")
+        more = self.index.extend()
+        if self.follow:
+            self.top = max(0, len(self.index) - self.VISIBLE_LINES)
+        self.render()
+        # تا پایان ساخت نمایه بی‌درنگ ادامه می‌دهد، سپس با فاصله فایل را دنبال می‌کند
+        self.after_id = self.window.after(1 if more else Config.ARCHIVE_VIEW_TAIL_MS, self.poll)
+    
+    def render(self, force=False):
+        """قرار دادن خط‌های پنجره فعلی در جعبه متنی"""
+        total = len(self.index)
+        margin = Config.ARCHIVE_VIEW_MARGIN
+        self.top = max(0, min(self.top, total - 1))
+        
+        first, last = self.rendered
+        needed_first = max(0, self.top - margin // 2)
+        needed_last = min(total, self.top + self.VISIBLE_LINES + margin // 2)
+        if force or needed_first < first or needed_last > last:
+            first = max(0, self.top - margin)
+            last = min(total, self.top + self.VISIBLE_LINES + margin)
+            self.text_widget.config(state=tk.NORMAL)
+            self.text_widget.delete("1.0", tk.END)
+            self.text_widget.insert("1.0", "\n".join(format_line(line) for line in self.index.lines(first, last)))
+            if self.line_no and first < self.line_no <= last:
+                row = self.line_no - first
+                self.text_widget.tag_add("match", f"{row}.0", f"{row}.end")
+            self.text_widget.config(state=tk.DISABLED)
+            self.rendered = (first, last)
+        
+        self.text_widget.yview(f"{self.top - first + 1}.0")
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + self.VISIBLE_LINES) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        self.status_label.config(text=f"خط {self.top + 1 if total else 0} از {total}")
+    
+    def scroll_to(self, top):
+        self.top = max(0, min(int(top), len(self.index) - 1))
+        self.follow = self.top + self.VISIBLE_LINES >= len(self.index)
+        self.render()
+    
+    def on_scrollbar(self, action, amount, unit=None):
+        """رویداد نوار اسکرول: moveto با کسر یا scroll با واحد خط و صفحه"""
+        if self.index is None:
+            return
+        if action == "moveto":
+            self.scroll_to(float(amount) * len(self.index))
+        elif action == "scroll":
+            step = self.VISIBLE_LINES if unit == "pages" else 1
+            self.scroll_to(self.top + int(amount) * step)
+    
+    def on_mouse_wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.scroll_to(self.top - 3)
+        else:
+            self.scroll_to(self.top + 3)
+        return "break"
+    
+    def on_key(self, action):
+        if action == "home":
+            self.scroll_to(0)
+        elif action == "end":
+            self.scroll_to(len(self.index) - self.VISIBLE_LINES)
+        elif action in ("up", "down"):
+            self.scroll_to(self.top + (-1 if action == "up" else 1))
+        else:
+            self.scroll_to(self.top + action * self.VISIBLE_LINES)
+        return "break"
+    
+    def on_destroy(self, event):
+        """بستن نگاشت فایل هنگام بسته شدن پنجره"""
+        if event.widget is not self.window:
+            return
+        if self.after_id is not None:
+            self.window.after_cancel(self.after_id)
+            self.after_id = None
+        if self.index is not None:
+            self.index.close()
+
+class ArchiveSearchWindow:
+    """پنجره نمایش نتایج جستجو در بایگانی‌ها"""
+    
+    def __init__(self, parent, query, results):
+        self.parent = parent
+        self.query = query
+        self.results = results
+        self.create_window()
+    
+    def create_window(self):
+        """ایجاد پنجره نتایج"""
+        self.window = tk.Toplevel(self.parent)
+        self.window.title(f"جستجو در بایگانی - {self.query}")
+        self.window.geometry("900x500")
+        
+        GUIUtils.create_label(
+            self.window, f"{len(self.results)} نتیجه (دوبار کلیک برای باز کردن فایل)", 9
+        ).pack(anchor=tk.W, padx=10, pady=5)
+        
+        frame = tk.Frame(self.window)
+        frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+        scrollbar = tk.Scrollbar(frame)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.listbox = tk.Listbox(
+            frame,
+            font=(Config.FONT_FAMILY, 10),
+            yscrollcommand=scrollbar.set
+        )
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.config(command=self.listbox.yview)
+        
+        for result in self.results:
+            name = os.path.basename(result['path'])
+            self.listbox.insert(tk.END, f"{name}:{result['line_no']}  {result['text']}")
+        self.listbox.bind("<Double-Button-1>", self.open_selected)
+    
+    def open_selected(self, event=None):
+        """باز کردن فایل نتیجه انتخاب شده روی همان خط"""
+        selection = self.listbox.curselection()
+        if selection:
+            result = self.results[selection[0]]
+            ArchiveViewer(self.window, result['path'], "بایگانی", line_no=result['line_no'])
\ No newline at end of file
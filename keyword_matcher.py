@@ -0,0 +1,122 @@
+# keyword_matcher.py
+from collections import deque, namedtuple
+from persian_text import normalize_text
+
+# قاعده‌ای که منطبق شده، کلیدواژه آن و محل انطباق در متن نرمال شده
+Match = namedtuple("Match", ["rule", "keyword", "start", "end"])
+
+class KeywordMatcher:
+    """تطبیق هم‌زمان همه کلیدواژه‌ها با یک بار پیمایش متن (Aho–Corasick)
+
+    کلیدواژه‌ها و متن هر دو با normalize_text یکسان می‌شوند. اولویت هر قاعده
+    ترتیب افزوده شدن آن است، پس find همان قاعده‌ای را برمی‌گرداند که جستجوی
+    خطی به ترتیب جدول پیدا می‌کرد.
+    """
+
+    def __init__(self, keywords=(), whole_word=False):
+        self.whole_word = whole_word
+        self._goto = [{}]
+        self._fail = [0]
+        self._terminal = [[]]
+        self._output = [[]]
+        self._patterns = []
+        self._built = True
+        for keyword in keywords:
+            self.add(keyword)
+        self.build()
+
+    def add(self, keyword, rule=None, whole_word=None):
+        """افزودن کلیدواژه؛ rule شناسه‌ای است که در انطباق برگردانده می‌شود"""
+        text = normalize_text(keyword)
+        if not text:
+            return
+
+        state = 0
+        for char in text:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._terminal.append([])
+            state = next_state
+
+        pattern_id = len(self._patterns)
+        self._patterns.append((
+            keyword if rule is None else rule,
+            text,
+            self.whole_word if whole_word is None else whole_word
+        ))
+        self._terminal[state].append(pattern_id)
+        self._built = False
+
+    def build(self):
+        """ساخت پیوندهای شکست؛ پس از آخرین add یک بار اجرا می‌شود"""
+        goto, fail = self._goto, self._fail
+        output = [list(ids) for ids in self._terminal]
+
+        queue = deque(goto[0].values())
+        for state in queue:
+            fail[state] = 0
+
+        # پیمایش سطح به سطح تا پیوند شکست هر گره پیش از فرزندانش آماده باشد
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                link = fail[state]
+                while link and char not in goto[link]:
+                    link = fail[link]
+                fail[next_state] = goto[link].get(char, 0)
+                output[next_state] += output[fail[next_state]]
+
+        self._output = output
+        self._built = True
+
+    def _scan(self, text):
+        if not self._built:
+            self.build()
+
+        goto, fail, output, patterns = self._goto, self._fail, self._output, self._patterns
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            for pattern_id in output[state]:
+                rule, keyword, whole_word = patterns[pattern_id]
+                start = position + 1 - len(keyword)
+                end = position + 1
+                if whole_word and not self._at_word_boundary(text, start, end):
+                    continue
+                yield pattern_id, Match(rule, keyword, start, end)
+
+    @staticmethod
+    def _at_word_boundary(text, start, end):
+        return ((start == 0 or not text[start - 1].isalnum())
+                and (end == len(text) or not text[end].isalnum()))
+
+    def matches(self, text):
+        """همه انطباق‌ها به ترتیب محل پایان در متن"""
+        return [match for _, match in self._scan(normalize_text(text))]
+
+    def search(self, text):
+        """اولین انطباق در متن؛ برای پرسش «آیا کلیدواژه‌ای هست» کافی است"""
+        for _, match in self._scan(normalize_text(text)):
+            return match
+        return None
+
+    def find(self, text):
+        """انطباقی که قاعده‌اش زودتر افزوده شده؛ معادل پیمایش جدول به ترتیب"""
+        best_id, best = None, None
+        for pattern_id, match in self._scan(normalize_text(text)):
+            if best_id is None or pattern_id < best_id:
+                best_id, best = pattern_id, match
+                if best_id == 0:
+                    break
+        return best
+
+    def __len__(self):
+        return len(self._patterns)
@@ -0,0 +1,132 @@
+# line_index.py
+import os
+import mmap
+from array import array
+from config import Config
+from segments import COMPRESSED_EXTENSIONS, is_compressed, read_segment
+
+class LineIndex:
+    """نمایه آفست خط‌ها روی فایل نگاشت شده در حافظه
+
+    آفست شروع هر خط کامل در یک آرایه نگه داشته می‌شود، پس رسیدن به هر خط
+    بدون خواندن خط‌های قبلی ممکن است. نمایه تکه به تکه با extend ساخته می‌شود
+    و با refresh خط‌های تازه انتهای فایل را دنبال می‌کند.
+
+    قطعه‌های فشرده بایگانی تغییر نمی‌کنند و حجمشان محدود است، پس یک بار
+    باز و در حافظه نگه داشته می‌شوند. اگر قطعه ساده پس از فشرده شدن حذف
+    شود، نمایه به نسخه فشرده آن منتقل می‌شود و path تغییر می‌کند.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.map = None
+        self.size = 0
+        self.starts = array('Q')
+        self.scanned = 0
+        self.exhausted = True
+        self.refresh()
+
+    def refresh(self):
+        """نگاشت دوباره اگر اندازه فایل تغییر کرده باشد؛ True اگر تغییری بود"""
+        if is_compressed(self.path):
+            if self.map is not None:
+                return False
+            self.map = read_segment(self.path)
+            self.size = len(self.map)
+            self.exhausted = False
+            return True
+
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            compressed = self._compressed_path()
+            if compressed is not None:
+                # محتوای نسخه فشرده همان بایت‌هاست، پس آفست‌های نمایه معتبر می‌مانند
+                self._close_map()
+                self.path = compressed
+                return self.refresh()
+            size = 0
+
+        if size == self.size:
+            return False
+
+        if size < self.size:
+            # فایل کوتاه یا جایگزین شده؛ نمایه از نو ساخته می‌شود
+            self._close_map()
+            self.starts = array('Q')
+            self.scanned = 0
+
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.exhausted = False
+        if size:
+            if self.file is None:
+                self.file = open(self.path, "rb")
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            size = len(self.map)
+        self.size = size
+        return True
+
+    def extend(self, max_bytes=None):
+        """افزودن خط‌های کامل تا حداکثر max_bytes؛ True اگر هنوز بخشی مانده باشد"""
+        if self.map is None:
+            return False
+
+        limit = min(self.size, self.scanned + (max_bytes or Config.ARCHIVE_VIEW_SCAN_BYTES))
+        find = self.map.find
+        starts = self.starts
+        position = self.scanned
+        while True:
+            newline = find(b"\n", position, limit)
+            if newline < 0:
+                break
+            starts.append(position)
+            position = newline + 1
+        self.scanned = position
+        self.exhausted = limit == self.size
+        return not self.exhausted
+
+    def __len__(self):
+        # خط ناقص انتهای فایل هم پس از پایان پیمایش شمرده می‌شود
+        partial = self.exhausted and self.scanned < self.size
+        return len(self.starts) + (1 if partial else 0)
+
+    def offset(self, line):
+        """آفست بایتی شروع یک خط"""
+        return self.starts[line] if line < len(self.starts) else self.scanned
+
+    def lines(self, start, stop):
+        """متن خط‌های start تا stop (بدون خود stop)"""
+        stop = min(stop, len(self))
+        if start >= stop:
+            return []
+
+        if stop < len(self.starts):
+            end = self.starts[stop]
+        else:
+            end = self.scanned if stop == len(self.starts) else self.size
+        data = self.map[self.offset(start):end]
+        text = data.decode("utf-8", errors="replace")
+        if text.endswith("\n"):
+            text = text[:-1]
+        return text.split("\n")
+
+    def _compressed_path(self):
+        for extension in COMPRESSED_EXTENSIONS.values():
+            if os.path.exists(self.path + extension):
+                return self.path + extension
+        return None
+
+    def _close_map(self):
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+        self.map = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def close(self):
+        self._close_map()
+        self.size = 0
@@ -1,12 +1,30 @@
 # main.py
+import os
 import tkinter as tk
+from config import Config
 from app import ChatApplication
+import tracing
+import profiler
 
 def main():
     """تابع اصلی برنامه"""
+    # ART_TRACE=1 ردیابی مراحل را فعال می‌کند و ART_TRACE_FILE مسیر فایل JSON-Lines است
+    if os.environ.get("ART_TRACE") or Config.TRACING_ENABLED:
+        tracing.enable(os.environ.get("ART_TRACE_FILE") or Config.TRACE_FILE)
+    
+    # ART_PROFILE=مسیر فایل (یا 1 برای مسیر پیش‌فرض) پروفایلر را از ابتدا روشن می‌کند
+    profile_path = os.environ.get("ART_PROFILE")
+    if profile_path:
+        profiler.start_profiler(None if profile_path == "1" else profile_path)
+    
     root = tk.Tk()
     app = ChatApplication(root)
-    root.mainloop()
+    try:
+        root.mainloop()
+    finally:
+        path = profiler.stop_profiler()
+        if path:
+            print(f"پروفایل در {path} ذخیره شد")
 
 if __name__ == "__main__":
     main()
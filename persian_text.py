@@ -0,0 +1,38 @@
+# persian_text.py
+import re
+import unicodedata
+
+# یکسان‌سازی حروف عربی و فارسی و ارقام
+_CHAR_MAP = str.maketrans({
+    "ي": "ی",
+    "ى": "ی",
+    "ئ": "ی",
+    "ك": "ک",
+    "ة": "ه",
+    "ۀ": "ه",
+    "أ": "ا",
+    "إ": "ا",
+    "ٱ": "ا",
+    "ؤ": "و",
+    "ـ": "",
+    "\u200c": " ",
+    "\u200f": "",
+    "\u200e": "",
+    **{chr(0x06F0 + i): str(i) for i in range(10)},
+    **{chr(0x0660 + i): str(i) for i in range(10)},
+})
+
+# اعراب عربی
+_DIACRITICS = re.compile("[\u064b-\u0652\u0670]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    """یکسان‌سازی متن فارسی برای مقایسه و کلید‌سازی"""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFC", text)
+    text = text.translate(_CHAR_MAP)
+    text = _DIACRITICS.sub("", text)
+    text = text.casefold()
+    return _WHITESPACE.sub(" ", text).strip()
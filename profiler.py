@@ -0,0 +1,159 @@
+# profiler.py
+import os
+import sys
+import json
+import time
+import datetime
+import threading
+from config import Config
+
+class SamplingProfiler:
+    """پروفایلر نمونه‌بردار: یک ترد پس‌زمینه پشته همه تردها را هر interval ثانیه می‌خواند
+
+    برنامه متوقف یا دوباره اجرا نمی‌شود و هزینه آن فقط به تعداد نمونه‌ها بستگی
+    دارد. خروجی به صورت پشته‌های فشرده (collapsed، برای flamegraph) یا فایل
+    speedscope ذخیره می‌شود.
+    """
+
+    def __init__(self, interval=None):
+        self.interval = interval or Config.PROFILER_INTERVAL
+        self.samples = {}
+        self.sample_count = 0
+        self.started_at = None
+        self.stopped_at = None
+        self._frame_names = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join()
+        self.stopped_at = time.time()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame_name(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, f"thread-{thread_id}"))
+                key = tuple(reversed(stack))
+                self.samples[key] = self.samples.get(key, 0) + 1
+            self.sample_count += 1
+
+    def _frame_name(self, code):
+        # نام هر تابع یک بار ساخته می‌شود
+        name = self._frame_names.get(code)
+        if name is None:
+            name = self._frame_names[code] = (
+                f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            )
+        return name
+
+    def collapsed(self):
+        """خط‌های «ترد;تابع;...;تابع تعداد» برای flamegraph.pl و ابزارهای مشابه"""
+        lines = [f"{';'.join(stack)} {count}" for stack, count in self.samples.items()]
+        return "\n".join(sorted(lines)) + "\n"
+
+    def speedscope(self):
+        """خروجی JSON قابل باز شدن در speedscope.app؛ یک پروفایل برای هر ترد"""
+        frames = []
+        frame_index = {}
+        profiles = {}
+
+        for stack, count in self.samples.items():
+            thread_name, calls = stack[0], stack[1:]
+            indexes = []
+            for name in calls:
+                if name not in frame_index:
+                    frame_index[name] = len(frames)
+                    function, _, location = name.partition(" (")
+                    file, _, line = location.rstrip(")").rpartition(":")
+                    frames.append({'name': function, 'file': file, 'line': int(line) if line.isdigit() else None})
+                indexes.append(frame_index[name])
+
+            profile = profiles.setdefault(thread_name, {
+                'type': "sampled",
+                'name': thread_name,
+                'unit': "seconds",
+                'startValue': 0,
+                'endValue': 0,
+                'samples': [],
+                'weights': [],
+            })
+            profile['samples'].append(indexes)
+            profile['weights'].append(count * self.interval)
+            profile['endValue'] += count * self.interval
+
+        return {
+            '$schema': "https://www.speedscope.app/file-format-schema.json",
+            'shared': {'frames': frames},
+            'profiles': list(profiles.values()),
+            'name': f"art {datetime.datetime.fromtimestamp(self.started_at or time.time()):%Y-%m-%d %H:%M:%S}",
+            'exporter': "art profiler.py",
+        }
+
+    def save(self, path):
+        """ذخیره نتیجه؛ پسوند .json یعنی speedscope و بقیه collapsed"""
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith(".json"):
+                json.dump(self.speedscope(), f, ensure_ascii=False)
+            else:
+                f.write(self.collapsed())
+        return path
+
+_profiler = None
+_profile_path = None
+_profiler_lock = threading.Lock()
+
+def default_profile_path():
+    """مسیر پیش‌فرض در پوشه پروفایل‌ها با قالب Config.PROFILER_FORMAT"""
+    extension = ".speedscope.json" if Config.PROFILER_FORMAT == "speedscope" else ".collapsed.txt"
+    name = datetime.datetime.now().strftime("profile_%Y-%m-%d_%H-%M-%S") + extension
+    return os.path.join(Config.PROFILER_FOLDER, name)
+
+def start_profiler(path=None, interval=None):
+    """شروع پروفایلر سراسری؛ نتیجه هنگام stop_profiler در path ذخیره می‌شود"""
+    global _profiler, _profile_path
+    with _profiler_lock:
+        if _profiler is not None and _profiler.running:
+            return _profiler
+        _profiler = SamplingProfiler(interval)
+        _profile_path = path or default_profile_path()
+        _profiler.start()
+        return _profiler
+
+def stop_profiler():
+    """توقف پروفایلر سراسری و ذخیره نتیجه؛ مسیر فایل یا None"""
+    global _profiler
+    with _profiler_lock:
+        if _profiler is None:
+            return None
+        profiler, _profiler = _profiler, None
+    profiler.stop()
+    return profiler.save(_profile_path)
+
+def is_profiling():
+    return _profiler is not None and _profiler.running
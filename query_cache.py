@@ -0,0 +1,120 @@
+# query_cache.py
+import json
+import time
+import threading
+from collections import OrderedDict
+from config import Config
+from persian_text import normalize_text
+
+class QueryCache:
+    """کش نتایج جستجو با کلید یکسان‌سازی شده، انقضای زمانی و حذف LRU"""
+
+    def __init__(self, ttl=None, max_entries=None, max_bytes=None):
+        self.ttl = ttl if ttl is not None else Config.SEARCH_CACHE_TTL
+        self.max_entries = max_entries or Config.SEARCH_CACHE_MAX_ENTRIES
+        self.max_bytes = max_bytes or Config.SEARCH_CACHE_MAX_BYTES
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(query):
+        return normalize_text(query)
+
+    @staticmethod
+    def _entry_size(results):
+        return len(json.dumps(results, ensure_ascii=False).encode("utf-8"))
+
+    def get(self, query):
+        """دریافت نتایج از کش؛ در صورت نبودن یا انقضا None"""
+        key = self.make_key(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            results, expires_at, size = entry
+            if expires_at <= time.time():
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return [dict(result) for result in results]
+
+    def put(self, query, results, stored_at=None):
+        """افزودن نتایج به کش؛ نتایج نمونه (mock) هرگز کش نمی‌شوند"""
+        if not results or any(result.get("mock") for result in results):
+            return
+
+        key = self.make_key(query)
+        stored_at = stored_at if stored_at is not None else time.time()
+        expires_at = stored_at + self.ttl
+        if expires_at <= time.time():
+            return
+
+        results = [dict(result) for result in results]
+        size = self._entry_size(results)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (results, expires_at, size)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def warm(self, search_results):
+        """پر کردن کش از دیکشنری ذخیره شده در search_results.json"""
+        loaded = 0
+        for query, results in search_results.items():
+            # نتایج نمونه‌ای که هنگام قطع شبکه ذخیره شده‌اند نباید جای جستجوی واقعی را بگیرند
+            results = [r for r in results if not r.get("mock")]
+            if not results:
+                continue
+
+            # هر کوئری ممکن است چند بار جستجو شده باشد؛ آخرین دفعه ملاک است
+            latest = max(result.get("search_time", "") for result in results)
+            latest_results = [r for r in results if r.get("search_time", "") == latest]
+            try:
+                stored_at = time.mktime(time.strptime(latest, "%Y-%m-%d %H:%M:%S"))
+            except ValueError:
+                continue
+
+            self.put(query, latest_results, stored_at)
+            loaded += 1
+        return loaded
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """آمار کش"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
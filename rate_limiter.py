@@ -0,0 +1,123 @@
+# rate_limiter.py
+import time
+import threading
+import email.utils
+from config import Config
+
+class HostRateLimiter:
+    """محدودکننده نرخ درخواست به ازای هر میزبان با الگوریتم token bucket
+
+    تا وقتی بودجه یک میزبان تمام نشده درخواست بدون تأخیر ارسال می‌شود.
+    با پاسخ 429 یا 503 نرخ نصف می‌شود و Retry-After رعایت می‌شود، و با
+    پاسخ‌های موفق نرخ به تدریج به مقدار اولیه برمی‌گردد.
+    """
+
+    THROTTLE_STATUSES = (429, 503)
+
+    def __init__(self, rate=None, burst=None, min_rate=None, max_backoff=None):
+        self.base_rate = rate or Config.RATE_LIMIT_PER_SECOND
+        self.burst = burst or Config.RATE_LIMIT_BURST
+        self.min_rate = min_rate or Config.RATE_LIMIT_MIN_PER_SECOND
+        self.max_backoff = max_backoff or Config.RATE_LIMIT_MAX_BACKOFF
+
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def _bucket(self, host, now):
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = {
+                'tokens': float(self.burst),
+                'rate': self.base_rate,
+                'updated': now,
+                'blocked_until': 0.0,
+                'failures': 0,
+            }
+        return bucket
+
+    def reserve(self, host):
+        """رزرو یک توکن؛ مدت زمانی که باید صبر کرد را برمی‌گرداند"""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._bucket(host, now)
+
+            elapsed = now - bucket['updated']
+            bucket['tokens'] = min(self.burst, bucket['tokens'] + elapsed * bucket['rate'])
+            bucket['updated'] = now
+
+            # توکن منفی یعنی درخواست در صف انتظار همین میزبان است
+            delay = 0.0
+            if bucket['tokens'] < 1:
+                delay = (1 - bucket['tokens']) / bucket['rate']
+            bucket['tokens'] -= 1
+
+            return max(delay, bucket['blocked_until'] - now)
+
+    def acquire(self, host, cancel_event=None):
+        """صبر تا رسیدن نوبت میزبان؛ در صورت لغو False برمی‌گرداند"""
+        delay = self.reserve(host)
+        if delay <= 0:
+            return True
+        if cancel_event is not None:
+            if cancel_event.wait(delay):
+                self.refund(host)
+                return False
+            return True
+        time.sleep(delay)
+        return True
+
+    def refund(self, host):
+        """بازگرداندن توکن رزرو شده درخواستی که پیش از ارسال لغو شد"""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._bucket(host, now)
+            bucket['tokens'] = min(self.burst, bucket['tokens'] + 1)
+
+    def on_response(self, host, status, retry_after=None):
+        """تنظیم نرخ بر اساس پاسخ میزبان"""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._bucket(host, now)
+
+            if status in self.THROTTLE_STATUSES:
+                bucket['failures'] += 1
+                bucket['rate'] = max(self.min_rate, bucket['rate'] / 2)
+
+                wait = self.parse_retry_after(retry_after)
+                if wait is None:
+                    wait = min(self.max_backoff, 2 ** bucket['failures'])
+                bucket['blocked_until'] = max(bucket['blocked_until'], now + min(wait, self.max_backoff))
+                bucket['tokens'] = min(bucket['tokens'], 0.0)
+            elif status < 400:
+                # بازگشت تدریجی به نرخ عادی
+                bucket['failures'] = 0
+                bucket['rate'] = min(self.base_rate, bucket['rate'] + self.base_rate * Config.RATE_LIMIT_RECOVERY_STEP)
+
+    @staticmethod
+    def parse_retry_after(value):
+        """تبدیل هدر Retry-After (ثانیه یا تاریخ HTTP) به ثانیه"""
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, retry_at.timestamp() - time.time())
+
+    def stats(self):
+        """وضعیت فعلی هر میزبان"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                host: {
+                    'rate': bucket['rate'],
+                    'tokens': bucket['tokens'],
+                    'blocked_for': max(0.0, bucket['blocked_until'] - now),
+                    'failures': bucket['failures'],
+                }
+                for host, bucket in self._buckets.items()
+            }
@@ -0,0 +1,114 @@
+# result_log.py
+import os
+import json
+import threading
+from config import Config
+
+class ResultLog:
+    """ذخیره افزایشی نتایج جستجو در یک لاگ JSON-Lines کنار search_results.json
+
+    هر جستجو فقط یک خط به انتهای لاگ اضافه می‌کند. فایل JSON اصلی به عنوان
+    snapshot باقی می‌ماند و در مرحله فشرده‌سازی با لاگ ادغام می‌شود.
+    """
+
+    def __init__(self, snapshot_path="search_results.json", compact_bytes=None, fsync=None):
+        self.snapshot_path = snapshot_path
+        self.log_path = snapshot_path + "l"
+        self.compacting_path = self.log_path + ".compacting"
+        self.compact_bytes = compact_bytes or Config.SEARCH_LOG_COMPACT_BYTES
+        self.fsync = Config.SEARCH_LOG_FSYNC if fsync is None else fsync
+        self._lock = threading.Lock()
+
+    def append(self, query, results):
+        """افزودن یک رکورد به لاگ؛ اندازه فعلی لاگ را برمی‌گرداند"""
+        line = json.dumps({"query": query, "results": results}, ensure_ascii=False) + "\n"
+        data = line.encode("utf-8")
+
+        with self._lock:
+            # یک write روی فایل O_APPEND، تا رکورد نیمه‌کاره با رکورد دیگری قاطی نشود
+            fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+                if self.fsync:
+                    os.fsync(fd)
+                size = os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+        return size
+
+    def needs_compaction(self, log_size):
+        return log_size >= self.compact_bytes
+
+    def load(self):
+        """بارگذاری snapshot و اعمال رکوردهای لاگ روی آن"""
+        with self._lock:
+            return self._load()
+
+    def _load(self, include_log=True):
+        data = {}
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+
+        # لاگی که فشرده‌سازی آن نیمه‌کاره مانده ممکن است قبلاً در snapshot آمده باشد
+        self._replay(self.compacting_path, data, skip_existing=True)
+        if include_log:
+            self._replay(self.log_path, data)
+        return data
+
+    @staticmethod
+    def _replay(path, data, skip_existing=False):
+        if not os.path.exists(path):
+            return
+
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # خط آخر ناقص پس از قطع ناگهانی برنامه
+                    continue
+
+                existing = data.setdefault(record["query"], [])
+                results = record["results"]
+                if skip_existing:
+                    seen = {(r.get("search_time"), r.get("url")) for r in existing}
+                    results = [r for r in results if (r.get("search_time"), r.get("url")) not in seen]
+                existing.extend(results)
+
+    def compact(self):
+        """ادغام لاگ در snapshot با نوشتن فایل موقت و rename اتمیک"""
+        with self._lock:
+            # تکمیل فشرده‌سازی قبلی که نیمه‌کاره مانده است
+            if os.path.exists(self.compacting_path):
+                self._write_snapshot(self._load(include_log=False))
+                os.remove(self.compacting_path)
+
+            if os.path.exists(self.log_path):
+                os.replace(self.log_path, self.compacting_path)
+
+            data = self._load()
+            self._write_snapshot(data)
+
+            if os.path.exists(self.compacting_path):
+                os.remove(self.compacting_path)
+        return data
+
+    def _write_snapshot(self, data):
+        temp_path = self.snapshot_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.snapshot_path)
+
+_logs = {}
+_logs_lock = threading.Lock()
+
+def get_result_log(snapshot_path="search_results.json"):
+    """لاگ مشترک برای هر فایل snapshot"""
+    with _logs_lock:
+        log = _logs.get(snapshot_path)
+        if log is None:
+            log = _logs[snapshot_path] = ResultLog(snapshot_path)
+        return log
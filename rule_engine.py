@@ -0,0 +1,166 @@
+# rule_engine.py
+import os
+import re
+import json
+import time
+import random
+import threading
+from config import Config
+from keyword_matcher import KeywordMatcher
+from persian_text import normalize_text
+
+class Rule:
+    """یک قاعده پاسخ: کلیدواژه‌ها یا عبارت منظم، اولویت و پاسخ‌ها"""
+
+    def __init__(self, rule_id, responses, keywords=(), regex=None, priority=0, whole_word=False):
+        if not responses:
+            raise ValueError(f"قاعده {rule_id} پاسخی ندارد")
+        if not keywords and not regex:
+            raise ValueError(f"قاعده {rule_id} کلیدواژه یا regex ندارد")
+        self.id = rule_id
+        self.responses = list(responses)
+        self.keywords = list(keywords)
+        self.regex = re.compile(regex, re.IGNORECASE) if regex else None
+        self.priority = priority
+        self.whole_word = whole_word
+
+    @classmethod
+    def from_dict(cls, data, position):
+        return cls(
+            data.get('id') or f"rule_{position}",
+            data.get('responses', []),
+            keywords=data.get('keywords', []),
+            regex=data.get('regex'),
+            priority=data.get('priority', 0),
+            whole_word=data.get('whole_word', False)
+        )
+
+class RuleSet:
+    """قاعده‌های یک نسخه فایل، نمایه شده برای انتخاب سریع
+
+    همه کلیدواژه‌ها در یک KeywordMatcher به ترتیب اولویت افزوده می‌شوند، پس
+    یک پیمایش پیام بهترین قاعده کلیدواژه‌ای را می‌دهد. قاعده‌های regex فقط
+    وقتی بررسی می‌شوند که اولویتشان از آن قاعده بیشتر باشد.
+    """
+
+    def __init__(self, rules, defaults):
+        # اولویت بیشتر زودتر؛ در اولویت برابر ترتیب فایل حفظ می‌شود
+        self.rules = sorted(rules, key=lambda rule: -rule.priority)
+        self.defaults = list(defaults)
+        self.by_id = {}
+        for rule in self.rules:
+            # شناسه تکراری رتبه و نتیجه matcher را مبهم می‌کند؛ بارگذاری دوباره رد می‌شود
+            if rule.id in self.by_id:
+                raise ValueError(f"شناسه قاعده تکراری: {rule.id}")
+            self.by_id[rule.id] = rule
+
+        self.matcher = KeywordMatcher()
+        self.rank = {}
+        for rank, rule in enumerate(self.rules):
+            self.rank[rule.id] = rank
+            for keyword in rule.keywords:
+                self.matcher.add(keyword, rule=rule.id, whole_word=rule.whole_word)
+        self.matcher.build()
+        self.regex_rules = [rule for rule in self.rules if rule.regex]
+
+    def match(self, text):
+        """regex‌ها روی متن نرمال شده اجرا می‌شوند، مثل کلیدواژه‌ها"""
+        best = None
+        found = self.matcher.find(text) if len(self.matcher) else None
+        if found:
+            best = self.by_id[found.rule]
+
+        normalized = normalize_text(text) if self.regex_rules else text
+        for rule in self.regex_rules:
+            if best is not None and self.rank[rule.id] >= self.rank[best.id]:
+                break
+            if rule.regex.search(normalized):
+                return rule
+        return best
+
+class RuleEngine:
+    """موتور قاعده‌های پاسخ که از فایل JSON خوانده و با تغییر فایل دوباره بارگذاری می‌شود
+
+    ساختار فایل:
+        {"defaults": [...], "rules": [{"id", "keywords" | "regex", "responses",
+                                       "priority", "whole_word"}, ...]}
+
+    اگر فایل وجود نداشته باشد یا خراب باشد، قاعده‌های پیش‌فرض داده شده
+    (یا آخرین نسخه سالم فایل) استفاده می‌شوند.
+    """
+
+    def __init__(self, path=None, templates=None, defaults=None):
+        self.path = path or Config.RESPONSE_RULES_PATH
+        self.fallback = RuleSet(
+            [Rule(keyword, responses, keywords=[keyword], priority=-position)
+             for position, (keyword, responses) in enumerate((templates or {}).items())],
+            defaults or []
+        )
+        self.ruleset = self.fallback
+        self._signature = None
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def maybe_reload(self):
+        """بارگذاری دوباره اگر زمان تغییر یا اندازه فایل عوض شده باشد؛ فقط یک stat"""
+        signature = self._file_signature()
+        if signature == self._signature:
+            return False
+
+        with self._lock:
+            if signature == self._signature:
+                return False
+            self._signature = signature
+            if signature is None:
+                self.ruleset = self.fallback
+                return True
+            try:
+                self.ruleset = self.load(self.path)
+            except (OSError, ValueError, TypeError, AttributeError, re.error) as e:
+                # قاعده‌های قبلی می‌مانند تا فایل اصلاح شود
+                print(f"خطا در بارگذاری قاعده‌های پاسخ {self.path}: {e}")
+                return False
+            return True
+
+    def load(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        rules = [Rule.from_dict(item, position) for position, item in enumerate(data.get('rules', []))]
+        return RuleSet(rules, data.get('defaults') or self.fallback.defaults)
+
+    def match(self, text):
+        """قاعده منطبق با بیشترین اولویت، یا None"""
+        self.maybe_reload()
+        return self.ruleset.match(text)
+
+    def respond(self, text):
+        """پاسخ قاعده منطبق یا یکی از پاسخ‌های پیش‌فرض"""
+        self.maybe_reload()
+        ruleset = self.ruleset
+        rule = ruleset.match(text)
+        self._record(rule.id if rule else None)
+        if rule:
+            return random.choice(rule.responses)
+        return random.choice(ruleset.defaults) if ruleset.defaults else ""
+
+    def _record(self, rule_id):
+        with self._lock:
+            stats = self._stats.setdefault(rule_id or "default", {'hits': 0, 'last_hit': None})
+            stats['hits'] += 1
+            stats['last_hit'] = time.time()
+
+    def stats(self):
+        """تعداد انطباق هر قاعده؛ در بارگذاری دوباره با شناسه قاعده حفظ می‌شود"""
+        with self._lock:
+            return {
+                'rules': len(self.ruleset.rules),
+                'source': self.path if self.ruleset is not self.fallback else "built-in",
+                'hits': {rule_id: dict(stats) for rule_id, stats in self._stats.items()},
+            }
@@ -7,38 +7,233 @@ import re
 from urllib.parse import quote_plus, urlparse
 import http.client
 import ssl
+import threading
+import atexit
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from config import Config
+from query_cache import QueryCache
+from result_log import get_result_log
+from storage import get_store
+from rate_limiter import HostRateLimiter
+import tracing
+from extractors import extract_bing, extract_duckduckgo, extract_links
 
 try:
     import requests
-    from bs4 import BeautifulSoup
+    from requests.adapters import HTTPAdapter
+    from urllib3.util import make_headers
     REQUESTS_AVAILABLE = True
 except ImportError:
     REQUESTS_AVAILABLE = False
     print("⚠️  کتابخانه requests نصب نیست. لطفا pip install requests را اجرا کنید.")
 
+# قفل ساخت کش سراسری، چون search_and_save ممکن است هم‌زمان از چند ترد صدا زده شود
+_store_lock = threading.Lock()
+_query_cache = None
+
+# جستجوگر سراسری که در تمام طول اجرای برنامه باقی می‌ماند
+_searcher_lock = threading.Lock()
+_shared_searcher = None
+
+class SingleFlight:
+    """ادغام فراخوانی‌های هم‌زمان با کلید یکسان در یک اجرا
+
+    اولین فراخواننده (leader) کار را انجام می‌دهد و بقیه منتظر نتیجه او
+    می‌مانند. اگر leader بدون نتیجه متوقف شود، منتظرها خودشان اجرا می‌کنند.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def join(self, key):
+        """پیوستن به اجرای در جریان؛ (call, True) یعنی فراخواننده leader است"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                return call, False
+            call = {'event': threading.Event(), 'result': None}
+            self._calls[key] = call
+            self.leaders += 1
+            return call, True
+
+    def finish(self, key, call, result=None):
+        """ثبت نتیجه leader؛ result برابر None یعنی منتظرها خودشان اجرا کنند"""
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call['result'] = result
+        call['event'].set()
+
+    @staticmethod
+    def wait(call, timeout=None):
+        """نتیجه leader؛ اگر تا timeout ثانیه (پیش‌فرض SEARCH_DEADLINE) آماده نشود None"""
+        if timeout is None:
+            timeout = Config.SEARCH_DEADLINE
+        if not call['event'].wait(timeout):
+            return None
+        return call['result']
+
+    def stats(self):
+        with self._lock:
+            return {'in_flight': len(self._calls), 'leaders': self.leaders, 'coalesced': self.coalesced}
+
+# جستجوهای هم‌زمان یک پرسش فقط یک بار به موتورها فرستاده می‌شوند
+_search_flight = SingleFlight()
+
+BING_SEARCH_URL = "https://www.bing.com/search?q="
+DUCKDUCKGO_SEARCH_URL = "https://html.duckduckgo.com/html/?q="
+
+def parse_bing_results(html):
+    """استخراج نتایج از صفحه بینگ"""
+    with tracing.span("parse"):
+        return extract_bing(html)
+
+def parse_duckduckgo_results(html):
+    """استخراج نتایج از صفحه داک‌داک‌گو"""
+    with tracing.span("parse"):
+        return extract_duckduckgo(html)
+
+def parse_generic_links(html):
+    """استخراج لینک‌ها به صورت عمومی برای موتورهای جایگزین"""
+    results = []
+    
+    with tracing.span("parse"):
+        links = extract_links(html)
+    for href, text in links:
+        text = text.strip()
+        
+        # فیلتر کردن لینک‌های معتبر
+        if (href.startswith('http') and 
+            not href.startswith('http://webcache.googleusercontent.com') and
+            not href.startswith('http://www.google.com') and
+            len(text) > 10):
+            
+            results.append({
+                'title': text[:100],
+                'url': href,
+                'description': ''
+            })
+    
+    return results
+
+def merge_results(merged, seen_urls, results):
+    """افزودن نتایج یک موتور به فهرست ادغام شده بدون تکرار آدرس"""
+    for result in results:
+        key = result.get('url', '').rstrip('/')
+        if key and key not in seen_urls:
+            seen_urls.add(key)
+            merged.append(result)
+
 class SafeWebSearcher:
+    # میزبان‌هایی که برای هر کدام یک استخر اتصال جداگانه نگه داشته می‌شود
+    ENGINE_HOSTS = [
+        'www.bing.com',
+        'html.duckduckgo.com',
+        'duckduckgo.com',
+        'search.yahoo.com',
+        'www.ask.com',
+        'www.baidu.com'
+    ]
+    
+    USER_AGENTS = [
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:89.0) Gecko/20100101 Firefox/89.0',
+        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:89.0) Gecko/20100101 Firefox/89.0'
+    ]
+    
+    # لیست موتورهای جستجوی جایگزین
+    SEARCH_ENGINES = [
+        'https://www.bing.com/search?q=',
+        'https://search.yahoo.com/search?p=',
+        'https://duckduckgo.com/html/?q=',
+        'https://www.ask.com/web?q=',
+        'https://www.baidu.com/s?wd='
+    ]
+    
     def __init__(self):
         self.search_results = {}
-        self.user_agents = [
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:89.0) Gecko/20100101 Firefox/89.0',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:89.0) Gecko/20100101 Firefox/89.0'
-        ]
-        
-        # لیست موتورهای جستجوی جایگزین
-        self.search_engines = [
-            'https://www.bing.com/search?q=',
-            'https://search.yahoo.com/search?p=',
-            'https://duckduckgo.com/html/?q=',
-            'https://www.ask.com/web?q=',
-            'https://www.baidu.com/s?wd='
-        ]
-        
+        self.user_agents = list(self.USER_AGENTS)
+        self.search_engines = list(self.SEARCH_ENGINES)
+        self.bing_search_url = BING_SEARCH_URL
+        self.duckduckgo_search_url = DUCKDUCKGO_SEARCH_URL
+        self._results_lock = threading.Lock()
+        self._state = threading.local()
+        
+        # اتصال‌های باز http.client برای روش دستی، به ازای هر میزبان
+        self._manual_connections = {}
+        self._manual_lock = threading.Lock()
+        self._manual_stats = {'new': 0, 'reused': 0}
+        self.session = self.create_session() if REQUESTS_AVAILABLE else None
+        self._fanout_executor = None
+        self._fanout_lock = threading.Lock()
+        self.rate_limiter = HostRateLimiter()
+        
+    @property
+    def last_results_mock(self):
+        """آیا آخرین search_query در همین ترد نتایج نمونه برگرداند"""
+        return getattr(self._state, 'mock', False)
+    
+    @last_results_mock.setter
+    def last_results_mock(self, value):
+        self._state.mock = value
+    
     def is_available(self):
         return REQUESTS_AVAILABLE
     
+    def create_session(self):
+        """ایجاد Session با استخر اتصال keep-alive برای هر موتور جستجو"""
+        session = requests.Session()
+        session.headers.update({
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.5',
+            # gzip و در صورت نصب بودن brotli، فشرده‌سازی br به صورت خودکار باز می‌شود
+            'Accept-Encoding': make_headers(accept_encoding=True)['accept-encoding'],
+            'Connection': 'keep-alive',
+            'Upgrade-Insecure-Requests': '1',
+        })
+        
+        for host in self.ENGINE_HOSTS:
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=Config.HTTP_POOL_MAXSIZE,
+                max_retries=0
+            )
+            session.mount(f'https://{host}/', adapter)
+        return session
+    
+    def connection_stats(self):
+        """تعداد اتصال‌های جدید و استفاده مجدد شده"""
+        stats = {'new': 0, 'reused': 0}
+        if self.session is not None:
+            for adapter in self.session.adapters.values():
+                pools = adapter.poolmanager.pools
+                for key in pools.keys():
+                    pool = pools[key]
+                    stats['new'] += pool.num_connections
+                    stats['reused'] += max(pool.num_requests - pool.num_connections, 0)
+        
+        with self._manual_lock:
+            stats['new'] += self._manual_stats['new']
+            stats['reused'] += self._manual_stats['reused']
+        return stats
+    
+    def close(self):
+        """بستن همه اتصال‌های باز"""
+        if self._fanout_executor is not None:
+            self._fanout_executor.shutdown(wait=False, cancel_futures=True)
+        if self.session is not None:
+            self.session.close()
+        with self._manual_lock:
+            for conn in self._manual_connections.values():
+                conn.close()
+            self._manual_connections.clear()
+    
     def get_random_delay(self):
         return random.uniform(2.0, 4.0)
     
@@ -61,12 +256,17 @@ class SafeWebSearcher:
             if parsed_url.query:
                 path += '?' + parsed_url.query
             
-            context = self.create_custom_ssl_context()
+            key = (parsed_url.scheme, host)
+            with self._manual_lock:
+                conn = self._manual_connections.pop(key, None)
+                self._manual_stats['reused' if conn else 'new'] += 1
             
-            if url.startswith('https'):
-                conn = http.client.HTTPSConnection(host, context=context)
-            else:
-                conn = http.client.HTTPConnection(host)
+            if conn is None:
+                if url.startswith('https'):
+                    context = self.create_custom_ssl_context()
+                    conn = http.client.HTTPSConnection(host, context=context, timeout=10)
+                else:
+                    conn = http.client.HTTPConnection(host, timeout=10)
             
             headers = {
                 'User-Agent': self.get_random_user_agent(),
@@ -75,101 +275,104 @@ class SafeWebSearcher:
                 'Connection': 'keep-alive',
             }
             
-            conn.request("GET", path, headers=headers)
-            response = conn.getresponse()
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+                body = response.read()
+            except Exception:
+                conn.close()
+                raise
+            
+            # اتصال برای درخواست بعدی به همین میزبان نگه داشته می‌شود
+            if response.will_close:
+                conn.close()
+            else:
+                with self._manual_lock:
+                    previous = self._manual_connections.pop(key, None)
+                    self._manual_connections[key] = conn
+                if previous is not None:
+                    previous.close()
             
             if response.status == 200:
-                data = response.read().decode('utf-8')
-                conn.close()
-                return data
+                return body.decode('utf-8')
             
-            conn.close()
             return None
             
         except Exception as e:
             print(f"خطا در درخواست دستی: {e}")
             return None
     
-    def safe_request(self, url):
+    def safe_request(self, url, timeout=10):
         """درخواست ایمن با روش‌های مختلف"""
         if not REQUESTS_AVAILABLE:
             return None
         
-        time.sleep(self.get_random_delay())
+        # فقط وقتی صبر می‌کنیم که بودجه درخواست این میزبان تمام شده باشد؛
+        # در حالت موازی اگر موتور دیگری زودتر جواب داده باشد درخواست ارسال نمی‌شود
+        host = urlparse(url).netloc
+        cancel_event = getattr(self._state, 'cancel_event', None)
+        with tracing.span("rate_limit"):
+            allowed = self.rate_limiter.acquire(host, cancel_event)
+        if not allowed:
+            return None
         
-        # روش 1: استفاده از requests
+        # روش 1: استفاده از requests با Session مشترک
         try:
             headers = {
                 'User-Agent': self.get_random_user_agent(),
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-                'Accept-Encoding': 'gzip, deflate',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
             }
             
-            response = requests.get(url, headers=headers, timeout=10, verify=False)
-            if response.status_code == 200:
-                return response.text
+            with tracing.span("http_fetch"):
+                response = self.session.get(url, headers=headers, timeout=timeout, verify=False,
+                                            stream=cancel_event is not None)
+                self.rate_limiter.on_response(host, response.status_code, response.headers.get('Retry-After'))
+                if response.status_code != 200:
+                    response.close()
+                    return None
+                return self.read_response(response, cancel_event)
                 
         except requests.exceptions.RequestException:
-            # روش 2: درخواست دستی اگر requests کار نکرد
-            return self.manual_http_request(url)
-        
-        return None
-    
-    def search_with_bing(self, query):
+            # روش 2: درخواست دستی اگر requests کار نکرد، مگر اینکه جستجو لغو شده باشد
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            with tracing.span("http_fetch_manual"):
+                return self.manual_http_request(url)
+    
+    @staticmethod
+    def read_response(response, cancel_event=None):
+        """خواندن بدنه پاسخ؛ با لغو جستجو خواندن قطع و اتصال آزاد می‌شود"""
+        if cancel_event is None:
+            return response.text
+        
+        chunks = []
+        for chunk in response.iter_content(chunk_size=16 * 1024):
+            if cancel_event.is_set():
+                response.close()
+                return None
+            chunks.append(chunk)
+        return b"".join(chunks).decode(response.encoding or 'utf-8', errors='replace')
+    
+    def search_with_bing(self, query, timeout=10):
         """جستجو با بینگ که معمولاً محدودیت کمتری دارد"""
-        search_url = f"https://www.bing.com/search?q={quote_plus(query)}"
-        html = self.safe_request(search_url)
+        search_url = self.bing_search_url + quote_plus(query)
+        html = self.safe_request(search_url, timeout)
         
         if html:
             try:
-                soup = BeautifulSoup(html, 'html.parser')
-                results = []
-                
-                # استخراج نتایج از بینگ
-                for result in soup.find_all('li', class_='b_algo'):
-                    title_elem = result.find('h2')
-                    link_elem = result.find('a')
-                    desc_elem = result.find('p')
-                    
-                    if title_elem and link_elem:
-                        results.append({
-                            'title': title_elem.get_text().strip(),
-                            'url': link_elem.get('href', ''),
-                            'description': desc_elem.get_text().strip() if desc_elem else ''
-                        })
-                
-                return results
+                return parse_bing_results(html)
             except:
                 pass
         
         return None
     
-    def search_with_duckduckgo(self, query):
+    def search_with_duckduckgo(self, query, timeout=10):
         """جستجو با داک‌داک‌گو"""
-        search_url = f"https://html.duckduckgo.com/html/?q={quote_plus(query)}"
-        html = self.safe_request(search_url)
+        search_url = self.duckduckgo_search_url + quote_plus(query)
+        html = self.safe_request(search_url, timeout)
         
         if html:
             try:
-                soup = BeautifulSoup(html, 'html.parser')
-                results = []
-                
-                for result in soup.find_all('div', class_='result'):
-                    title_elem = result.find('a', class_='result__a')
-                    link_elem = result.find('a', class_='result__a')
-                    desc_elem = result.find('a', class_='result__snippet')
-                    
-                    if title_elem and link_elem:
-                        results.append({
-                            'title': title_elem.get_text().strip(),
-                            'url': link_elem.get('href', ''),
-                            'description': desc_elem.get_text().strip() if desc_elem else ''
-                        })
-                
-                return results
+                return parse_duckduckgo_results(html)
             except:
                 pass
         
@@ -177,112 +380,231 @@ class SafeWebSearcher:
     
     def search_query(self, query, max_results=5):
         """جستجوی واقعی"""
+        self.last_results_mock = False
         if not REQUESTS_AVAILABLE:
+            self.last_results_mock = True
             return self.get_mock_results(query)
         
         print(f"🔍 در حال جستجوی واقعی برای: {query}")
         
-        # اول با بینگ امتحان می‌کنیم
-        results = self.search_with_bing(query)
+        results = list(self.iter_search(query, max_results))
+        if results:
+            return results
         
-        # اگر بینگ جواب نداد، با داک‌داک‌گو امتحان می‌کنیم
-        if not results:
-            results = self.search_with_duckduckgo(query)
+        self.last_results_mock = True
+        return self.get_mock_results(query)
+    
+    def iter_search(self, query, max_results=5):
+        """برگرداندن تدریجی نتایج واقعی به محض رسیدن پاسخ هر موتور"""
+        if not REQUESTS_AVAILABLE:
+            return
         
-        # اگر بازهم جواب نداد، از موتورهای دیگر استفاده می‌کنیم
-        if not results:
-            results = self.try_alternative_search_engines(query)
+        if Config.SEARCH_PARALLEL:
+            yield from self.iter_search_parallel(query, max_results)
+            return
         
-        if results:
-            return results[:max_results]
+        # اول بینگ، بعد داک‌داک‌گو و در آخر موتورهای دیگر
+        for engine in (self.search_with_bing, self.search_with_duckduckgo, self.try_alternative_search_engines):
+            results = engine(query)
+            if results:
+                yield from results[:max_results]
+                return
+    
+    def get_parallel_engines(self):
+        """موتورهای حالت موازی به صورت دو رده
+
+        رده اول بینگ و داک‌داک‌گو با استخراج‌کننده اختصاصی‌اند. موتورهای عمومی
+        رده دوم فقط وقتی اجرا می‌شوند که رده اول هیچ نتیجه‌ای نداده باشد، چون
+        لینک‌های عمومی صفحه‌هایشان نباید با نتایج واقعی رقابت کنند.
+        """
+        primary = [
+            ('bing', self.search_with_bing),
+            ('duckduckgo', self.search_with_duckduckgo),
+        ]
+        fallback = []
+        for engine_url in self.search_engines:
+            host = urlparse(engine_url).netloc
+            # بینگ و داک‌داک‌گو با استخراج‌کننده اختصاصی خودشان اجرا شده‌اند
+            if 'bing.com' in host or 'duckduckgo.com' in host:
+                continue
+            fallback.append((host, lambda query, timeout, url=engine_url: self.search_with_engine(url, query, timeout)))
+        return [primary, fallback]
+    
+    def get_fanout_executor(self):
+        with self._fanout_lock:
+            if self._fanout_executor is None:
+                self._fanout_executor = ThreadPoolExecutor(
+                    max_workers=Config.SEARCH_FANOUT_WORKERS,
+                    thread_name_prefix="search-engine"
+                )
+            return self._fanout_executor
+    
+    def _run_engine(self, engine, query, timeout, cancel_event):
+        """اجرای یک موتور در ترد استخر با امکان لغو"""
+        if cancel_event.is_set():
+            return None
+        self._state.cancel_event = cancel_event
+        try:
+            return engine(query, timeout)
+        finally:
+            self._state.cancel_event = None
+    
+    def search_query_parallel(self, query, max_results=5, engine_timeout=None, deadline=None):
+        """اجرای هم‌زمان موتورها؛ اولین موتوری که max_results نتیجه بدهد برنده است"""
+        results = list(self.iter_search_parallel(query, max_results, engine_timeout, deadline))
+        return results or None
+    
+    def iter_search_parallel(self, query, max_results=5, engine_timeout=None, deadline=None):
+        """اجرای هم‌زمان موتورهای هر رده و برگرداندن نتایج جدید هر موتور به محض رسیدن"""
+        engine_timeout = engine_timeout or Config.SEARCH_ENGINE_TIMEOUT
+        deadline = deadline or Config.SEARCH_DEADLINE
+        
+        merged = []
+        seen_urls = set()
+        end_time = time.monotonic() + deadline
+        
+        for engines in self.get_parallel_engines():
+            if merged or time.monotonic() >= end_time:
+                break
+            # هر رده حداکثر engine_timeout ثانیه فرصت دارد تا رده بعدی از مهلت کل سهم داشته باشد
+            tier_end = min(end_time, time.monotonic() + engine_timeout)
+            yield from self._run_tier(engines, query, max_results, engine_timeout, tier_end, merged, seen_urls)
+    
+    def _run_tier(self, engines, query, max_results, engine_timeout, tier_end, merged, seen_urls):
+        executor = self.get_fanout_executor()
+        cancel_event = threading.Event()
+        # ردیابی پیام جاری همراه کار به ترد موتور منتقل می‌شود
+        run_engine = tracing.propagate(self._run_engine)
+        pending = {
+            executor.submit(run_engine, engine, query, engine_timeout, cancel_event)
+            for _, engine in engines
+        }
         
-        return self.get_mock_results(query)
+        try:
+            while pending:
+                remaining = tier_end - time.monotonic()
+                if remaining <= 0:
+                    break
+                
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                winner = False
+                for future in done:
+                    if future.cancelled() or future.exception() is not None:
+                        continue
+                    
+                    results = future.result() or []
+                    yielded = len(merged)
+                    merge_results(merged, seen_urls, results)
+                    yield from merged[yielded:max_results]
+                    if len(results) >= max_results or len(merged) >= max_results:
+                        winner = True
+                
+                if winner:
+                    break
+        finally:
+            # بقیه موتورها لغو می‌شوند؛ safe_request لغو را حین خواندن پاسخ هم بررسی می‌کند
+            cancel_event.set()
+            for future in pending:
+                future.cancel()
+    
+    def search_with_engine(self, engine_url, query, timeout=10):
+        """جستجو با یک موتور جایگزین و استخراج عمومی لینک‌ها"""
+        search_url = engine_url + quote_plus(query)
+        html = self.safe_request(search_url, timeout)
+        
+        if html:
+            results = parse_generic_links(html)
+            if results:
+                return results[:5]
+        
+        return None
     
     def try_alternative_search_engines(self, query):
         """امتحان موتورهای جستجوی جایگزین"""
         for engine_url in self.search_engines:
             try:
-                search_url = engine_url + quote_plus(query)
-                html = self.safe_request(search_url)
-                
-                if html:
-                    soup = BeautifulSoup(html, 'html.parser')
-                    
-                    # استخراج لینک‌ها به صورت عمومی
-                    links = soup.find_all('a', href=True)
-                    results = []
-                    
-                    for link in links:
-                        href = link.get('href', '')
-                        text = link.get_text().strip()
-                        
-                        # فیلتر کردن لینک‌های معتبر
-                        if (href.startswith('http') and 
-                            not href.startswith('http://webcache.googleusercontent.com') and
-                            not href.startswith('http://www.google.com') and
-                            len(text) > 10):
-                            
-                            results.append({
-                                'title': text[:100],
-                                'url': href,
-                                'description': ''
-                            })
-                    
-                    if results:
-                        return results[:5]
-                        
+                results = self.search_with_engine(engine_url, query)
+                if results:
+                    return results
             except:
                 continue
         
         return None
     
     def get_mock_results(self, query):
-        """نتایج نمونه برای تست"""
+        """نتایج نمونه برای تست؛ با mock علامت می‌خورند تا پس از ذخیره هم وارد کش نشوند"""
         return [
             {
                 'title': f'نتایج جستجو برای: {query}',
                 'url': 'https://www.example.com/search?q=' + quote_plus(query),
-                'description': 'این یک نتیجه نمونه است. برای نتایج واقعی مطمئن شوید کتابخانه requests نصب شده باشد.'
+                'description': 'این یک نتیجه نمونه است. برای نتایج واقعی مطمئن شوید کتابخانه requests نصب شده باشد.',
+                'mock': True
             },
             {
                 'title': 'راهنمای نصب requests',
                 'url': 'https://pypi.org/project/requests/',
-                'description': 'دستور نصب: pip install requests'
+                'description': 'دستور نصب: pip install requests',
+                'mock': True
             }
         ]
     
     def save_to_dictionary(self, query, results):
         """ذخیره نتایج"""
-        if query not in self.search_results:
-            self.search_results[query] = []
-        
         # اضافه کردن timestamp به هر نتیجه
         timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
         for result in results:
             result['search_time'] = timestamp
             result['query'] = query
         
-        self.search_results[query].extend(results)
-        self.save_to_file()
+        with self._results_lock:
+            if query not in self.search_results:
+                self.search_results[query] = []
+            self.search_results[query].extend(results)
+        with tracing.span("persist_results"):
+            self.append_to_file(query, results)
         
         print(f"✅ {len(results)} نتیجه برای '{query}' ذخیره شد")
         return len(results)
     
+    def append_to_file(self, query, results, filename="search_results.json"):
+        """افزودن نتایج یک جستجو به لاگ افزایشی، یا به پایگاه داده در حالت sqlite"""
+        store = get_store()
+        if store is not None:
+            store.add_results(query, results)
+            return
+        
+        result_log = get_result_log(filename)
+        try:
+            log_size = result_log.append(query, results)
+            if result_log.needs_compaction(log_size):
+                result_log.compact()
+        except Exception as e:
+            print(f"❌ خطا در ذخیره فایل: {e}")
+    
     def save_to_file(self, filename="search_results.json"):
-        """ذخیره در فایل"""
+        """ذخیره در فایل (ادغام لاگ در فایل اصلی)"""
+        store = get_store()
+        if store is not None:
+            store.flush()
+            return
+        
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(self.search_results, f, ensure_ascii=False, indent=2)
+            get_result_log(filename).compact()
             print(f"💾 نتایج در {filename} ذخیره شد")
         except Exception as e:
             print(f"❌ خطا در ذخیره فایل: {e}")
     
     def load_from_file(self, filename="search_results.json"):
         """بارگذاری از فایل"""
+        store = get_store()
+        if store is not None:
+            self.search_results = store.results()
+            return bool(self.search_results)
+        
+        result_log = get_result_log(filename)
         try:
-            if os.path.exists(filename):
-                with open(filename, 'r', encoding='utf-8') as f:
-                    self.search_results = json.load(f)
+            if os.path.exists(filename) or os.path.exists(result_log.log_path):
+                self.search_results = result_log.load()
                 print(f"📂 نتایج از {filename} بارگذاری شد")
                 return True
         except Exception as e:
@@ -338,19 +660,110 @@ if __name__ == "__main__":
     searcher.save_to_file()
     print(f"\n✅ تست کامل شد. نتایج در search_results.json ذخیره شدند")
 
+def get_searcher():
+    """جستجوگر مشترک با Session و اتصال‌های باز در تمام طول اجرای برنامه"""
+    global _shared_searcher
+    with _searcher_lock:
+        if _shared_searcher is None:
+            _shared_searcher = SafeWebSearcher()
+            atexit.register(_shared_searcher.close)
+        return _shared_searcher
+
+def get_query_cache():
+    """کش سراسری نتایج که در اولین استفاده از search_results.json پر می‌شود"""
+    global _query_cache
+    with _store_lock:
+        if _query_cache is None:
+            searcher = get_searcher()
+            searcher.load_from_file()
+            _query_cache = QueryCache()
+            _query_cache.warm(searcher.get_results())
+        return _query_cache
+
+def _flight_key(query, max_results, searcher):
+    # جستجوگر اختصاصی (مثلاً در سنجش) با جستجوگر مشترک ادغام نمی‌شود
+    return (QueryCache.make_key(query), max_results, id(searcher) if searcher else None)
+
+def search_and_save_stream(query, max_results=3, searcher=None):
+    """نسخه تدریجی search_and_save که هر نتیجه را به محض رسیدن برمی‌گرداند"""
+    cache = get_query_cache()
+    cached = cache.get(query)
+    if cached is not None:
+        yield from cached[:max_results]
+        return
+    
+    key = _flight_key(query, max_results, searcher)
+    call, leader = _search_flight.join(key)
+    if not leader:
+        results = _search_flight.wait(call)
+        if results is not None:
+            yield from (dict(result) for result in results)
+            return
+    
+    results = []
+    completed = None
+    try:
+        searcher = searcher or get_searcher()
+        with tracing.span("search"):
+            for result in searcher.iter_search(query, max_results):
+                results.append(result)
+                yield result
+        
+        is_mock = not results
+        if is_mock:
+            results = searcher.get_mock_results(query)
+            yield from results
+        
+        searcher.save_to_dictionary(query, results)
+        if not is_mock:
+            cache.put(query, results)
+        completed = results
+    finally:
+        # جستجوی نیمه‌کاره (لغو، خطا یا بسته شدن تولیدکننده) به منتظرها داده نمی‌شود
+        if leader:
+            _search_flight.finish(key, call, completed)
+
 # در انتهای search.py این تابع باید باشد:
-def search_and_save(query, max_results=3):
-    searcher = SafeWebSearcher()
-    searcher.load_from_file()
-    
+def search_and_save(query, max_results=3, searcher=None):
+    cache = get_query_cache()
+    cached = cache.get(query)
+    if cached is not None:
+        return cached[:max_results]
+    
+    key = _flight_key(query, max_results, searcher)
+    call, leader = _search_flight.join(key)
+    if not leader:
+        results = _search_flight.wait(call)
+        if results is not None:
+            return [dict(result) for result in results]
+    
+    results = None
+    try:
+        with tracing.span("search"):
+            results = _search_and_save(query, max_results, searcher or get_searcher(), cache)
+    finally:
+        if leader:
+            _search_flight.finish(key, call, results)
+    return results
+
+def _search_and_save(query, max_results, searcher, cache):
     results = searcher.search_query(query, max_results)
     
     if results:
+        # ذخیره فقط یک خط به لاگ اضافه می‌کند و نیازی به بارگذاری کل فایل نیست
         searcher.save_to_dictionary(query, results)
+        
+        # نتایج نمونه کش نمی‌شوند تا خطای موقت شبکه ماندگار نشود
+        if not searcher.last_results_mock:
+            cache.put(query, results)
         return results
     
     return []
 
+def get_search_flight_stats():
+    """آمار ادغام جستجوهای هم‌زمان"""
+    return _search_flight.stats()
+
 # # search.py
 # import time
 # import random
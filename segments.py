@@ -0,0 +1,244 @@
+# segments.py
+import os
+import gzip
+import json
+import time
+import shutil
+import datetime
+import threading
+from config import Config
+from archive_writer import get_archive_writer
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+MANIFEST_NAME = "manifest.json"
+
+# پسوند فایل قطعه‌های فشرده برای هر روش
+COMPRESSED_EXTENSIONS = {'gzip': ".gz", 'zstd': ".zst"}
+
+# قطعه‌های تازه JSON-Lines هستند؛ .txt بایگانی‌های متنی قدیمی است
+ARCHIVE_EXTENSIONS = (".jsonl", ".txt")
+
+def archive_patterns():
+    """الگوهای glob همه فایل‌های بایگانی، ساده و فشرده"""
+    return [
+        "*" + extension + compressed
+        for extension in ARCHIVE_EXTENSIONS
+        for compressed in ("",) + tuple(COMPRESSED_EXTENSIONS.values())
+    ]
+
+# تابع‌هایی که پس از فشرده شدن هر قطعه با مسیر تازه آن صدا زده می‌شوند
+_compress_listeners = []
+
+def add_compress_listener(callback):
+    _compress_listeners.append(callback)
+
+def is_compressed(path):
+    return path.endswith(tuple(COMPRESSED_EXTENSIONS.values()))
+
+def read_segment(path):
+    """محتوای کامل یک قطعه، فشرده یا ساده، به صورت بایت"""
+    if path.endswith(COMPRESSED_EXTENSIONS['zstd']):
+        if not ZSTD_AVAILABLE:
+            raise OSError(f"برای خواندن {path} کتابخانه zstandard لازم است")
+        with open(path, "rb") as f:
+            return zstandard.ZstdDecompressor().stream_reader(f).read()
+    if path.endswith(COMPRESSED_EXTENSIONS['gzip']):
+        with gzip.open(path, "rb") as f:
+            return f.read()
+    with open(path, "rb") as f:
+        return f.read()
+
+def compress_file(source, method):
+    """فشرده کردن فایل با نوشتن فایل موقت و rename اتمیک؛ مسیر فایل فشرده را برمی‌گرداند"""
+    target = source + COMPRESSED_EXTENSIONS[method]
+    temp_path = target + ".tmp"
+    with open(source, "rb") as src, open(temp_path, "wb") as dst:
+        if method == "zstd":
+            with zstandard.ZstdCompressor().stream_writer(dst, closefd=False) as writer:
+                shutil.copyfileobj(src, writer)
+        else:
+            with gzip.GzipFile(fileobj=dst, mode="wb", compresslevel=6) as writer:
+                shutil.copyfileobj(src, writer)
+    os.replace(temp_path, target)
+    return target
+
+def get_compression():
+    """روش فشرده‌سازی قطعه‌های بسته؛ در حالت auto اگر zstandard نصب باشد zstd"""
+    method = Config.ARCHIVE_COMPRESSION
+    if method == "auto":
+        return "zstd" if ZSTD_AVAILABLE else "gzip"
+    if method == "zstd" and not ZSTD_AVAILABLE:
+        return "gzip"
+    return method
+
+class SegmentManager:
+    """قطعه‌بندی بایگانی هر موضوع بر اساس حجم و زمان
+
+    هر موضوع یک قطعه فعال دارد که تا رسیدن به ARCHIVE_SEGMENT_MAX_BYTES یا
+    گذشتن ARCHIVE_SEGMENT_MAX_AGE ثانیه به آن افزوده می‌شود. قطعه بسته شده
+    پس از نوشته شدن آخرین خط‌های در صف فشرده می‌شود و بازه زمانی، حجم و
+    موضوع هر قطعه در manifest.json پوشه نگه داشته می‌شود.
+
+    انتخاب قطعه فعال فقط از حافظه انجام می‌شود؛ حجم قطعه‌ها را ArchiveWriter
+    پس از هر نوشتن دسته‌ای گزارش می‌دهد.
+    """
+
+    def __init__(self, folder, prefix, max_bytes=None, max_age=None):
+        self.folder = folder
+        self.prefix = prefix
+        self.max_bytes = max_bytes or Config.ARCHIVE_SEGMENT_MAX_BYTES
+        self.max_age = max_age or Config.ARCHIVE_SEGMENT_MAX_AGE
+        self.manifest_path = os.path.join(folder, MANIFEST_NAME)
+
+        self._lock = threading.RLock()
+        self._segments = []
+        self._active = {}
+        self._by_path = {}
+        self._load_manifest()
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                self._segments = json.load(f).get('segments', [])
+        except FileNotFoundError:
+            self._segments = []
+        except (OSError, ValueError) as e:
+            print(f"خطا در خواندن {self.manifest_path}: {e}")
+            self._segments = []
+
+        for segment in self._segments:
+            path = os.path.join(self.folder, segment['file'])
+            self._by_path[path] = segment
+            if segment['end'] is None and segment['file'].endswith(ARCHIVE_EXTENSIONS[0]):
+                # قطعه فعال از اجرای قبلی ادامه پیدا می‌کند
+                try:
+                    segment['bytes'] = os.path.getsize(path)
+                except OSError:
+                    segment['bytes'] = 0
+                self._active[segment['topic']] = segment
+                continue
+            if segment['end'] is None:
+                # قطعه فعال با قالب قدیمی بسته می‌شود تا دو قالب در یک فایل قاطی نشوند
+                segment['end'] = time.time()
+            if not segment.get('compression') and get_compression() != "none":
+                # فشرده‌سازی که در اجرای قبلی نیمه‌کاره مانده
+                self._schedule_compress(segment, delay=0)
+
+    def _save_manifest(self):
+        temp_path = self.manifest_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({'segments': self._segments}, f, ensure_ascii=False, indent=1)
+        os.replace(temp_path, self.manifest_path)
+
+    def active_path(self, topic):
+        """مسیر قطعه فعال موضوع؛ اگر قطعه پر یا قدیمی شده باشد قطعه تازه باز می‌شود"""
+        now = time.time()
+        segment = self._active.get(topic)
+        if segment is not None and segment['bytes'] < self.max_bytes and now - segment['start'] < self.max_age:
+            return os.path.join(self.folder, segment['file'])
+
+        with self._lock:
+            segment = self._active.get(topic)
+            if segment is None or segment['bytes'] >= self.max_bytes or now - segment['start'] >= self.max_age:
+                if segment is not None:
+                    self._close(segment, now)
+                segment = self._open(topic, now)
+                self._save_manifest()
+            return os.path.join(self.folder, segment['file'])
+
+    def _open(self, topic, now):
+        stamp = datetime.datetime.fromtimestamp(now).strftime("%Y-%m-%d_%H-%M-%S")
+        extension = ARCHIVE_EXTENSIONS[0]
+        name = f"{self.prefix}_{stamp}_{topic}{extension}"
+        # دو قطعه در یک ثانیه برای یک موضوع نام یکسان نمی‌گیرند
+        counter = 1
+        while os.path.join(self.folder, name) in self._by_path:
+            counter += 1
+            name = f"{self.prefix}_{stamp}-{counter}_{topic}{extension}"
+
+        segment = {'file': name, 'topic': topic, 'start': now, 'end': None, 'bytes': 0, 'compression': None}
+        self._segments.append(segment)
+        self._by_path[os.path.join(self.folder, name)] = segment
+        self._active[topic] = segment
+        return segment
+
+    def _close(self, segment, now):
+        segment['end'] = now
+        del self._active[segment['topic']]
+        if get_compression() != "none":
+            self._schedule_compress(segment)
+
+    def _schedule_compress(self, segment, delay=None):
+        # صبر تا خط‌هایی که پیش از بسته شدن در صف ArchiveWriter بوده‌اند نوشته شوند
+        if delay is None:
+            delay = Config.ARCHIVE_FLUSH_INTERVAL * 2
+        timer = threading.Timer(delay, self._compress, args=(segment,))
+        timer.daemon = True
+        timer.start()
+
+    def _compress(self, segment):
+        source = os.path.join(self.folder, segment['file'])
+        method = get_compression()
+
+        writer = get_archive_writer()
+        try:
+            # خط‌های در صف نوشته می‌شوند و نوشتن‌های دیرتر به قطعه فعال موضوع می‌روند
+            writer.seal(source, lambda topic=segment['topic']: self.active_path(topic))
+            target = compress_file(source, method)
+        except FileNotFoundError:
+            writer.unseal(source)
+            return
+        except OSError as e:
+            print(f"خطا در فشرده‌سازی {source}: {e}")
+            return
+
+        with self._lock:
+            del self._by_path[source]
+            segment['file'] = os.path.basename(target)
+            segment['compression'] = method
+            segment['stored_bytes'] = os.path.getsize(target)
+            self._by_path[target] = segment
+            self._save_manifest()
+        os.remove(source)
+        writer.unseal(source)
+        for listener in _compress_listeners:
+            listener(target)
+
+    def record_write(self, path, nbytes):
+        """ثبت حجم نوشته شده؛ ArchiveWriter پس از هر نوشتن دسته‌ای صدا می‌زند"""
+        # همان قفل چرخش و فشرده‌سازی، تا شمارش حجم بین تردها گم نشود
+        with self._lock:
+            segment = self._by_path.get(path)
+            if segment is not None:
+                segment['bytes'] += nbytes
+
+    def segments(self, topic=None, start=None, end=None):
+        """قطعه‌های manifest که با موضوع و بازه زمانی هم‌پوشانی دارند، بدون فهرست کردن پوشه"""
+        with self._lock:
+            found = []
+            for segment in self._segments:
+                if topic is not None and segment['topic'] != topic:
+                    continue
+                if end is not None and segment['start'] > end:
+                    continue
+                if start is not None and segment['end'] is not None and segment['end'] < start:
+                    continue
+                found.append(dict(segment, path=os.path.join(self.folder, segment['file'])))
+            return found
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+def get_segment_manager(folder, prefix):
+    """مدیر قطعه‌های مشترک هر پوشه؛ حجم نوشته‌ها از ArchiveWriter گرفته می‌شود"""
+    with _managers_lock:
+        manager = _managers.get(folder)
+        if manager is None:
+            manager = _managers[folder] = SegmentManager(folder, prefix)
+            get_archive_writer().add_listener(manager.record_write)
+        return manager
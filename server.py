@@ -0,0 +1,207 @@
+# server.py
+# سرویس HTTP محلی برای پاسخ‌دهنده خودکار، بدون نیاز به رابط گرافیکی
+#
+#   python server.py --port 8765
+#   curl -d '{"message": "سلام", "topic": "پشتیبانی"}' http://127.0.0.1:8765/chat
+import sys
+import json
+import time
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from config import Config
+from auto_responder import AutoResponder
+from archive_writer import get_archive_writer
+from batch import process_item, percentile
+from search import get_query_cache, get_searcher, get_search_flight_stats
+import tracing
+
+class ResponderService:
+    """استخر پاسخ‌دهنده با صف محدود؛ وقتی صف پر باشد درخواست رد می‌شود"""
+
+    def __init__(self, workers=None, max_queue=None):
+        self.workers = workers or Config.SERVER_WORKERS
+        self.max_queue = Config.SERVER_MAX_QUEUE if max_queue is None else max_queue
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="service")
+        # ظرفیت کل: پیام‌های در حال اجرا به اضافه پیام‌های در صف
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.in_flight = 0
+        self.counters = {'requests': 0, 'completed': 0, 'errors': 0, 'rejected': 0, 'timeouts': 0}
+        self.latencies = deque(maxlen=1000)
+
+    def submit(self, message, topic):
+        """ارسال پیام؛ اگر ظرفیت پر باشد None برمی‌گرداند"""
+        with self._lock:
+            self.counters['requests'] += 1
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.counters['rejected'] += 1
+            return None
+
+        with self._lock:
+            self.in_flight += 1
+        item = {'id': None, 'message': message, 'topic': topic}
+        future = self.executor.submit(process_item, item)
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future):
+        self._slots.release()
+        record = future.result() if not future.cancelled() else {'error': "cancelled"}
+        with self._lock:
+            self.in_flight -= 1
+            if 'error' in record:
+                self.counters['errors'] += 1
+            else:
+                self.counters['completed'] += 1
+                self.latencies.append(record['elapsed_ms'])
+
+    def record_timeout(self):
+        with self._lock:
+            self.counters['timeouts'] += 1
+
+    def health(self):
+        with self._lock:
+            in_flight = self.in_flight
+        return {
+            'status': "ok" if in_flight < self.workers + self.max_queue else "saturated",
+            'in_flight': in_flight,
+            'workers': self.workers,
+            'max_queue': self.max_queue,
+            'uptime_seconds': time.time() - self.started_at,
+        }
+
+    def metrics(self):
+        with self._lock:
+            counters = dict(self.counters)
+            latencies = list(self.latencies)
+        return {
+            'health': self.health(),
+            'counters': counters,
+            'latency_ms': {
+                'p50': percentile(latencies, 50),
+                'p95': percentile(latencies, 95),
+                'p99': percentile(latencies, 99),
+            },
+            'search_flight': get_search_flight_stats(),
+            'query_cache': get_query_cache().stats(),
+            'connections': get_searcher().connection_stats(),
+            'rules': AutoResponder.RULE_ENGINE.stats(),
+            'stages': tracing.histograms() if tracing.is_enabled() else None,
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+class ChatRequestHandler(BaseHTTPRequestHandler):
+    """مسیرها: POST /chat، GET /health و GET /metrics"""
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path == "/health":
+            health = service.health()
+            self.send_json(200 if health['status'] == "ok" else 503, health)
+        elif self.path == "/metrics":
+            self.send_json(200, service.metrics())
+        else:
+            self.send_json(404, {'error': "مسیر پیدا نشد"})
+
+    def do_POST(self):
+        if self.path != "/chat":
+            self.send_json(404, {'error': "مسیر پیدا نشد"})
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > Config.SERVER_MAX_BODY:
+            self.send_json(413, {'error': "درخواست بیش از حد بزرگ است"})
+            return
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self.send_json(400, {'error': "JSON نامعتبر"})
+            return
+
+        message = body.get('message') if isinstance(body, dict) else None
+        if not isinstance(message, str) or not message.strip():
+            self.send_json(400, {'error': "فیلد message لازم است"})
+            return
+        topic = body.get('topic') or "جلسه_عمومی"
+
+        service = self.server.service
+        future = service.submit(message.strip(), topic)
+        if future is None:
+            # فشار برگشتی: کلاینت بعداً دوباره تلاش کند
+            self.send_json(503, {'error': "صف پاسخ‌ها پر است"}, {"Retry-After": "1"})
+            return
+
+        try:
+            record = future.result(timeout=Config.SERVER_REQUEST_TIMEOUT)
+        except FutureTimeoutError:
+            service.record_timeout()
+            self.send_json(504, {'error': "پاسخ در زمان مقرر آماده نشد"})
+            return
+
+        if 'error' in record:
+            self.send_json(500, {'error': record['error']})
+        else:
+            self.send_json(200, {'reply': record['reply'], 'topic': topic, 'elapsed_ms': record['elapsed_ms']})
+
+    def send_json(self, status, data, headers=None):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def create_server(host=None, port=None, workers=None, max_queue=None):
+    server = ThreadingHTTPServer((host or Config.SERVER_HOST, Config.SERVER_PORT if port is None else port),
+                                 ChatRequestHandler)
+    server.daemon_threads = True
+    server.service = ResponderService(workers, max_queue)
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="سرویس HTTP محلی پاسخ‌دهنده خودکار")
+    parser.add_argument("--host", default=Config.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=Config.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=Config.SERVER_WORKERS)
+    parser.add_argument("--max-queue", type=int, default=Config.SERVER_MAX_QUEUE)
+    parser.add_argument("--no-search", action="store_true", help="بدون جستجوی اینترنتی")
+    parser.add_argument("--trace", nargs="?", const="", metavar="FILE",
+                        help="زمان‌سنجی مراحل در /metrics؛ با FILE هر ردیابی در آن فایل نوشته می‌شود")
+    args = parser.parse_args(argv)
+
+    if args.no_search:
+        Config.AUTO_SEARCH = False
+    if args.trace is not None:
+        tracing.enable(args.trace or None)
+
+    # کش و جستجوگر پیش از اولین درخواست آماده می‌شوند
+    get_query_cache()
+
+    server = create_server(args.host, args.port, args.workers, args.max_queue)
+    print(f"✅ سرویس روی http://{args.host}:{server.server_port} اجرا شد", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+        server.service.shutdown()
+        get_archive_writer().close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
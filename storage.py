@@ -0,0 +1,269 @@
+# storage.py
+# پشتیبان SQLite برای پیام‌ها، پاسخ‌ها و تاریخچه جستجو
+#
+#   python storage.py import            # انتقال یک باره بایگانی‌ها و search_results.json
+#   python storage.py import --db art.db --results search_results.json
+import os
+import sys
+import json
+import time
+import glob
+import atexit
+import sqlite3
+import argparse
+import datetime
+import threading
+from config import Config
+from result_log import get_result_log
+from segments import archive_patterns
+from archive_format import archive_topic, read_records
+
+class SQLiteStore:
+    """ذخیره پیام‌ها و نتایج جستجو در SQLite با حالت WAL و نوشتن دسته‌ای
+
+    سطرها در حافظه جمع می‌شوند و وقتی تعدادشان به STORAGE_BATCH_SIZE برسد یا
+    STORAGE_FLUSH_INTERVAL ثانیه بگذرد، در یک تراکنش نوشته می‌شوند. هر خواندن
+    پیش از اجرا سطرهای در صف را می‌نویسد.
+
+    ستون archive مشخص می‌کند پیام از کدام بایگانی است: chat (پیام‌های کاربر)
+    یا response (پیام کاربر و پاسخ ربات).
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY,
+            archive TEXT NOT NULL,
+            topic TEXT NOT NULL,
+            role TEXT,
+            text TEXT NOT NULL,
+            ts TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS messages_topic_ts ON messages(topic, ts);
+        CREATE INDEX IF NOT EXISTS messages_ts ON messages(ts);
+        CREATE TABLE IF NOT EXISTS search_results (
+            id INTEGER PRIMARY KEY,
+            query TEXT NOT NULL,
+            url TEXT,
+            search_time TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS search_results_query ON search_results(query, search_time);
+        CREATE INDEX IF NOT EXISTS search_results_time ON search_results(search_time);
+        CREATE TABLE IF NOT EXISTS imports (
+            path TEXT PRIMARY KEY,
+            rows INTEGER NOT NULL,
+            imported_at TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, db_path=None, batch_size=None, flush_interval=None):
+        self.db_path = db_path or Config.STORAGE_DB_PATH
+        self.batch_size = batch_size or Config.STORAGE_BATCH_SIZE
+        self.flush_interval = flush_interval or Config.STORAGE_FLUSH_INTERVAL
+
+        # یک اتصال مشترک؛ دسترسی از تردهای مختلف با قفل مرتب می‌شود
+        self._lock = threading.RLock()
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(self.SCHEMA)
+
+        self._messages = []
+        self._results = []
+        self._oldest_pending = None
+
+        self._closed = False
+        self._wakeup = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="sqlite-store", daemon=True)
+        self._flusher.start()
+
+    def add_message(self, archive, topic, role, text, ts=None):
+        """افزودن یک پیام به صف نوشتن"""
+        ts = ts or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            self._messages.append((archive, topic, role, text, ts))
+            self._queued()
+
+    def add_results(self, query, results):
+        """افزودن نتایج یک جستجو به صف نوشتن"""
+        with self._lock:
+            self._results.extend(
+                (query, result.get('url'), result.get('search_time'), json.dumps(result, ensure_ascii=False))
+                for result in results
+            )
+            self._queued()
+
+    def _queued(self):
+        if self._oldest_pending is None:
+            self._oldest_pending = time.monotonic()
+        if len(self._messages) + len(self._results) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """نوشتن همه سطرهای در صف در یک تراکنش"""
+        with self._lock:
+            if self._closed or not (self._messages or self._results):
+                return
+            messages, self._messages = self._messages, []
+            results, self._results = self._results, []
+            self._oldest_pending = None
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT INTO messages (archive, topic, role, text, ts) VALUES (?, ?, ?, ?, ?)", messages
+                )
+                self.connection.executemany(
+                    "INSERT INTO search_results (query, url, search_time, data) VALUES (?, ?, ?, ?)", results
+                )
+
+    def _flush_loop(self):
+        while not self._wakeup.wait(self.flush_interval / 2):
+            with self._lock:
+                oldest = self._oldest_pending
+                if oldest is not None and time.monotonic() - oldest >= self.flush_interval:
+                    try:
+                        self.flush()
+                    except sqlite3.Error as e:
+                        print(f"خطا در ذخیره پایگاه داده: {e}")
+
+    def messages(self, topic=None, start=None, end=None, archive=None, limit=None):
+        """پیام‌ها به ترتیب زمان با فیلتر موضوع و بازه زمانی («YYYY-MM-DD HH:MM:SS»)"""
+        conditions, params = [], []
+        for column, operator, value in (("topic", "=", topic), ("ts", ">=", start),
+                                        ("ts", "<=", end), ("archive", "=", archive)):
+            if value is not None:
+                conditions.append(f"{column} {operator} ?")
+                params.append(value)
+        sql = "SELECT archive, topic, role, text, ts FROM messages"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY ts, id"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            self.flush()
+            rows = self.connection.execute(sql, params).fetchall()
+        return [
+            {'archive': archive, 'topic': topic, 'role': role, 'text': text, 'ts': ts}
+            for archive, topic, role, text, ts in rows
+        ]
+
+    def results(self, query=None, start=None, end=None):
+        """نتایج جستجو به شکل search_results.json: {کوئری: [نتیجه‌ها]}"""
+        conditions, params = [], []
+        for column, operator, value in (("query", "=", query), ("search_time", ">=", start),
+                                        ("search_time", "<=", end)):
+            if value is not None:
+                conditions.append(f"{column} {operator} ?")
+                params.append(value)
+        sql = "SELECT query, data FROM search_results"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY id"
+
+        with self._lock:
+            self.flush()
+            rows = self.connection.execute(sql, params).fetchall()
+        grouped = {}
+        for row_query, data in rows:
+            grouped.setdefault(row_query, []).append(json.loads(data))
+        return grouped
+
+    def is_imported(self, path):
+        with self._lock:
+            return self.connection.execute("SELECT 1 FROM imports WHERE path = ?", (path,)).fetchone() is not None
+
+    def mark_imported(self, path, rows):
+        with self._lock:
+            self.flush()
+            with self.connection:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO imports (path, rows, imported_at) VALUES (?, ?, ?)",
+                    (path, rows, datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+                )
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self.flush()
+            self._closed = True
+            self.connection.close()
+        self._wakeup.set()
+
+def import_archives(store, folders=None, results_path="search_results.json"):
+    """انتقال یک باره بایگانی‌ها و نتایج جستجو؛ فایل‌های منتقل شده دوباره خوانده نمی‌شوند"""
+    folders = folders or {'chat': Config.ARCHIVE_FOLDER, 'response': Config.RESPONSE_FOLDER}
+    report = {'files': 0, 'messages': 0, 'results': 0, 'skipped': 0}
+
+    for archive, folder in folders.items():
+        paths = []
+        for pattern in archive_patterns():
+            paths.extend(glob.glob(os.path.join(folder, pattern)))
+
+        for path in sorted(paths):
+            if store.is_imported(path):
+                report['skipped'] += 1
+                continue
+            topic = archive_topic(path)
+            count = 0
+            try:
+                for record in read_records(path, topic):
+                    store.add_message(archive, record.get('topic') or topic, record.get('role'),
+                                      record.get('text', ""), record.get('ts'))
+                    count += 1
+            except OSError as e:
+                print(f"خطا در خواندن {path}: {e}")
+                continue
+            store.mark_imported(path, count)
+            report['files'] += 1
+            report['messages'] += count
+
+    result_log = get_result_log(results_path)
+    if not store.is_imported(results_path) and (os.path.exists(results_path) or os.path.exists(result_log.log_path)):
+        count = 0
+        for query, results in result_log.load().items():
+            store.add_results(query, results)
+            count += len(results)
+        store.mark_imported(results_path, count)
+        report['results'] = count
+
+    return report
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    """پایگاه داده مشترک وقتی Config.STORAGE_BACKEND برابر sqlite است، وگرنه None"""
+    global _store
+    if Config.STORAGE_BACKEND != "sqlite":
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = SQLiteStore()
+            atexit.register(_store.close)
+        return _store
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="پایگاه داده SQLite پیام‌ها و نتایج جستجو")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="انتقال بایگانی‌های متنی و search_results.json")
+    import_parser.add_argument("--db", default=Config.STORAGE_DB_PATH)
+    import_parser.add_argument("--results", default="search_results.json")
+    args = parser.parse_args(argv)
+
+    store = SQLiteStore(args.db)
+    try:
+        report = import_archives(store, results_path=args.results)
+    finally:
+        store.close()
+    print(
+        f"✅ {report['files']} فایل ({report['messages']} پیام) و {report['results']} نتیجه جستجو منتقل شد؛ "
+        f"{report['skipped']} فایل قبلاً منتقل شده بود",
+        file=sys.stderr
+    )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
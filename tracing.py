@@ -0,0 +1,189 @@
+# tracing.py
+import json
+import time
+import bisect
+import itertools
+import threading
+import contextvars
+from config import Config
+
+# مرزهای سطل‌های هیستوگرام به میلی‌ثانیه
+BUCKET_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_enabled = Config.TRACING_ENABLED
+_lock = threading.Lock()
+_histograms = {}
+_trace_file = None
+_last_trace = None
+_trace_ids = itertools.count(1)
+
+# ردیابی جاری؛ با propagate به تردهای استخر منتقل می‌شود
+_current = contextvars.ContextVar("trace", default=None)
+
+class _NoopSpan:
+    """span خالی که وقتی ردیابی غیرفعال است برگردانده می‌شود"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NOOP = _NoopSpan()
+
+class Span:
+    def __init__(self, name):
+        self.name = name
+        self.trace = _current.get()
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed_ms = (time.perf_counter() - self.start) * 1000
+        _observe(self.name, elapsed_ms)
+        if self.trace is not None:
+            self.trace.spans.append({
+                'name': self.name,
+                'start_ms': (self.start - self.trace.start) * 1000,
+                'duration_ms': elapsed_ms,
+                'thread': threading.current_thread().name,
+                'error': exc_type.__name__ if exc_type else None,
+            })
+        return False
+
+class Trace:
+    """ردیابی یک پیام با همه spanهای مراحل آن"""
+
+    def __init__(self, name, attributes):
+        self.id = next(_trace_ids)
+        self.name = name
+        self.attributes = attributes
+        self.spans = []
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration_ms = None
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        self.duration_ms = (time.perf_counter() - self.start) * 1000
+        _observe(self.name, self.duration_ms)
+        _finish(self)
+        return False
+
+    def breakdown(self):
+        """مجموع زمان هر مرحله به میلی‌ثانیه، به ترتیب اولین اجرا"""
+        totals = {}
+        for span in self.spans:
+            totals[span['name']] = totals.get(span['name'], 0.0) + span['duration_ms']
+        return totals
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'started_at': self.started_at,
+            'duration_ms': self.duration_ms,
+            'attributes': self.attributes,
+            'spans': self.spans,
+        }
+
+def span(name):
+    """زمان‌سنجی یک مرحله؛ وقتی ردیابی غیرفعال است هزینه‌اش یک بررسی شرط است"""
+    if not _enabled:
+        return _NOOP
+    return Span(name)
+
+def trace(name, **attributes):
+    """شروع ردیابی یک پیام؛ spanهای داخل آن به این ردیابی تعلق می‌گیرند"""
+    if not _enabled:
+        return _NOOP
+    return Trace(name, attributes)
+
+def propagate(func):
+    """پوشاندن تابع تا در ترد دیگر هم زیر ردیابی جاری اجرا شود
+
+    هر فراخوانی نسخه جداگانه‌ای از context می‌گیرد، چون یک Context هم‌زمان
+    فقط در یک ترد قابل اجراست و تابع پوشانده شده چند بار به استخر داده می‌شود.
+    """
+    if not _enabled or _current.get() is None:
+        return func
+    context = contextvars.copy_context()
+    def run(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+    return run
+
+def _observe(name, elapsed_ms):
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = {
+                'count': 0, 'sum_ms': 0.0, 'max_ms': 0.0,
+                'buckets': [0] * (len(BUCKET_BOUNDS_MS) + 1)
+            }
+        histogram['count'] += 1
+        histogram['sum_ms'] += elapsed_ms
+        histogram['max_ms'] = max(histogram['max_ms'], elapsed_ms)
+        histogram['buckets'][bisect.bisect_left(BUCKET_BOUNDS_MS, elapsed_ms)] += 1
+
+def _finish(finished):
+    global _last_trace
+    with _lock:
+        _last_trace = finished
+        if _trace_file is not None:
+            _trace_file.write(json.dumps(finished.to_dict(), ensure_ascii=False) + "\n")
+            _trace_file.flush()
+
+def _percentile(histogram, percent):
+    """تخمین صدک از روی مرز بالای سطل"""
+    target = histogram['count'] * percent / 100
+    seen = 0
+    for index, count in enumerate(histogram['buckets']):
+        seen += count
+        if seen >= target and count:
+            return BUCKET_BOUNDS_MS[index] if index < len(BUCKET_BOUNDS_MS) else histogram['max_ms']
+    return 0.0
+
+def histograms():
+    """خلاصه هیستوگرام هر مرحله"""
+    with _lock:
+        snapshot = {name: dict(h, buckets=list(h['buckets'])) for name, h in _histograms.items()}
+    for histogram in snapshot.values():
+        histogram['mean_ms'] = histogram['sum_ms'] / histogram['count'] if histogram['count'] else 0.0
+        histogram['p50_ms'] = _percentile(histogram, 50)
+        histogram['p95_ms'] = _percentile(histogram, 95)
+        histogram['p99_ms'] = _percentile(histogram, 99)
+    return snapshot
+
+def last_trace():
+    return _last_trace
+
+def is_enabled():
+    return _enabled
+
+def enable(trace_path=None):
+    """فعال کردن ردیابی؛ با trace_path هر ردیابی یک خط JSON در آن فایل است"""
+    global _enabled, _trace_file
+    with _lock:
+        if trace_path and _trace_file is None:
+            _trace_file = open(trace_path, "a", encoding="utf-8")
+        _enabled = True
+
+def disable():
+    global _enabled, _trace_file
+    with _lock:
+        _enabled = False
+        if _trace_file is not None:
+            _trace_file.close()
+            _trace_file = None
+
+def reset():
+    global _last_trace
+    with _lock:
+        _histograms.clear()
+        _last_trace = None
@@ -2,10 +2,13 @@
 import os
 import re
 import datetime
-import tkinter as tk
-from tkinter import scrolledtext  # این خط اضافه شود
-from tkinter import messagebox
+import functools
 from config import Config
+from archive_writer import get_archive_writer
+from segments import get_segment_manager
+from storage import get_store
+from archive_format import encode_record, make_record, split_role
+import tracing
 
 class FileUtils:
     """ابزارهای مربوط به فایل و نام فایل"""
@@ -15,7 +18,11 @@ class FileUtils:
         """پاکسازی متن برای استفاده در نام فایل"""
         if not text or not isinstance(text, str):
             return "بدون_موضوع"
-        
+        return FileUtils._sanitize_cached(text)
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=Config.TOPIC_CACHE_SIZE)
+    def _sanitize_cached(text):
         # حذف کاراکترهای غیرمجاز
         text = re.sub(r'[<>:"/\\|?*]', '', text)
         # جایگزینی فاصله با آندرلاین
@@ -33,26 +40,34 @@ class FileUtils:
     @staticmethod
     def generate_user_filename(topic):
         """تولید نام فایل برای بایگانی کاربر"""
-        now = datetime.datetime.now()
-        date_part = now.strftime("%Y-%m-%d_%H-%M")
-        sanitized_topic = FileUtils.sanitize_filename(topic)
-        filename = f"chat_{date_part}_{sanitized_topic}.txt"
-        return os.path.join(Config.get_archive_folder(), filename)
+        return topic_paths.resolve(topic)[0]
     
     @staticmethod
-    def save_message_to_file(filename, message):
-        """ذخیره پیام در فایل"""
+    def save_message_to_file(filename, message, topic=None, on_error=None):
+        """ذخیره پیام در فایل، یا در پایگاه داده وقتی STORAGE_BACKEND برابر sqlite است
+
+        خطا به on_error (مثلاً نمایش پیام در رابط گرافیکی) داده می‌شود و بدون آن
+        فقط چاپ می‌شود تا اجرای دسته‌ای و سرور بدون نمایشگر متوقف نشوند.
+        """
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         try:
-            with open(filename, "a", encoding="utf-8") as file:
-                file.write(f"[{timestamp}] {message}\n")
+            role, text = split_role(message)
+            sanitized_topic = FileUtils.sanitize_filename(topic)
+            store = get_store()
+            if store is not None:
+                store.add_message("chat", sanitized_topic, role, text, timestamp)
+                return True
+            
+            # نوشتن در صف؛ سرویس بایگانی آن را دسته‌ای روی دیسک می‌نویسد
+            with tracing.span("archive_write"):
+                get_archive_writer().write(filename, encode_record(make_record(sanitized_topic, role, text, timestamp)))
             return True
         except Exception as e:
-            messagebox.showerror("خطا", f"خطا در ذخیره فایل: {e}")
+            FileUtils.report_error(f"خطا در ذخیره فایل: {e}", on_error)
             return False
     
     @staticmethod
-    def read_file_content(filename):
+    def read_file_content(filename, on_error=None):
         """خواندن محتوای فایل"""
         try:
             if os.path.exists(filename):
@@ -60,94 +75,39 @@ class FileUtils:
                     return file.read()
             return None
         except Exception as e:
-            messagebox.showerror("خطا", f"خطا در خواندن فایل: {e}")
+            FileUtils.report_error(f"خطا در خواندن فایل: {e}", on_error)
             return None
-
-class GUIUtils:
-    """ابزارهای مربوط به رابط کاربری"""
-    
-    @staticmethod
-    def create_scrolled_text(parent, width, height, font_size=10):
-        """ایجاد جعبه متنی با قابلیت اسکرول"""
-        return scrolledtext.ScrolledText(  # این خط تغییر کرد
-            parent,
-            wrap=tk.WORD,
-            width=width,
-            height=height,
-            font=(Config.FONT_FAMILY, font_size),
-            bg="#f8f9fa"
-        )
-    
-    @staticmethod
-    def create_button(parent, text, command, bg_color, fg_color="white", width=None):
-        """ایجاد دکمه با استایل یکسان"""
-        button = tk.Button(
-            parent,
-            text=text,
-            command=command,
-            font=(Config.FONT_FAMILY, 10),
-            bg=bg_color,
-            fg=fg_color,
-            width=width,
-            relief=tk.RAISED,
-            bd=2
-        )
-        return button
     
     @staticmethod
-    def create_entry(parent, font_size=12, width=50):
-        """ایجاد فیلد ورودی"""
-        return tk.Entry(
-            parent,
-            font=(Config.FONT_FAMILY, font_size),
-            width=width,
-            relief=tk.SUNKEN,
-            bd=2
-        )
-    
-    @staticmethod
-    def create_label(parent, text, font_size=10, **kwargs):
-        """ایجاد برچسب"""
-        return tk.Label(
-            parent,
-            text=text,
-            font=(Config.FONT_FAMILY, font_size),
-            **kwargs
-        )
+    def report_error(message, on_error=None):
+        if on_error is not None:
+            on_error(message)
+        else:
+            print(message)
+
+class TopicPathResolver:
+    """تبدیل موضوع به مسیر قطعه فعال بایگانی‌های آن
 
-class ArchiveViewer:
-    """کلاس برای نمایش محتوای بایگانی"""
+    هر موضوع در هر پوشه یک قطعه فعال دارد که SegmentManager بر اساس حجم و
+    عمر آن عوض می‌کند؛ این تصمیم از حافظه گرفته می‌شود و به دیسک سر نمی‌زند.
+    """
     
-    def __init__(self, parent, filename, title="بایگانی"):
-        self.parent = parent
-        self.filename = filename
-        self.title = title
-        self.create_window()
+    def __init__(self):
+        self._managers = None
     
-    def create_window(self):
-        """ایجاد پنجره نمایش بایگانی"""
-        self.window = tk.Toplevel(self.parent)
-        self.window.title(f"{self.title} - {os.path.basename(self.filename)}")
-        self.window.geometry("900x700")
-        
-        self.create_widgets()
-        self.load_content()
+    def managers(self):
+        """(قطعه‌های بایگانی کاربر، قطعه‌های بایگانی پاسخ‌ها)"""
+        if self._managers is None:
+            self._managers = (
+                get_segment_manager(Config.get_archive_folder(), "chat"),
+                get_segment_manager(Config.get_response_folder(), "response"),
+            )
+        return self._managers
     
-    def create_widgets(self):
-        """ایجاد ویجت‌های پنجره"""
-        # فریم برای اطلاعات فایل
-        info_frame = tk.Frame(self.window)
-        info_frame.pack(padx=10, pady=5, fill=tk.X)
-        
-        GUIUtils.create_label(info_frame, f"فایل: {self.filename}", 9).pack(anchor=tk.W)
-        
-        # جعبه متنی برای نمایش محتوا
-        self.text_widget = GUIUtils.create_scrolled_text(self.window, 100, 35)
-        self.text_widget.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-    
-    def load_content(self):
-        """بارگذاری محتوای فایل"""
-        content = FileUtils.read_file_content(self.filename)
-        if content:
-            self.text_widget.insert(tk.END, content)
-        self.text_widget.config(state=tk.DISABLED)
\ No newline at end of file
+    def resolve(self, topic):
+        """(مسیر بایگانی کاربر، مسیر بایگانی پاسخ‌ها) برای قطعه فعال موضوع"""
+        sanitized_topic = FileUtils.sanitize_filename(topic)
+        chat_segments, response_segments = self.managers()
+        return chat_segments.active_path(sanitized_topic), response_segments.active_path(sanitized_topic)
+
+topic_paths = TopicPathResolver()